@@ -0,0 +1,4 @@
+"""
+Benchmarks for the RSA-OAEP tool. Run from the project root, e.g.
+python -m benchmarks.bench_mgf1
+"""
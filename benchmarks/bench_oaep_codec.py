@@ -0,0 +1,98 @@
+"""Microbenchmark of the OAEP encode/decode internals (no RSA modexp).
+
+Compares the original per-byte XOR and separator loop against the
+big-integer codec in OAEPContext, and checks that both produce
+byte-identical encoded messages for the same seed.
+"""
+
+import os
+import timeit
+
+from oaep import OAEPContext, mgf1
+
+HLEN = 32
+KEY_SIZES = (1024, 2048, 3072, 4096)
+
+def encode_reference(ctx, message, seed):
+    """Original encoding: per-byte generator XORs and bytes concatenation"""
+    k = ctx.k
+    PS = b'\x00' * (k - len(message) - 2 * HLEN - 2)
+    DB = ctx.lhash + PS + b'\x01' + message
+    dbMask = mgf1(seed, k - HLEN - 1)
+    maskedDB = bytes(a ^ b for a, b in zip(DB, dbMask))
+    seedMask = mgf1(maskedDB, HLEN)
+    maskedSeed = bytes(a ^ b for a, b in zip(seed, seedMask))
+    return b'\x00' + maskedSeed + maskedDB
+
+def decode_reference(ctx, EM):
+    """Original decoding: per-byte XORs and a while loop to find 0x01"""
+    maskedSeed = EM[1:1 + HLEN]
+    maskedDB = EM[1 + HLEN:]
+    seedMask = mgf1(maskedDB, HLEN)
+    seed = bytes(a ^ b for a, b in zip(maskedSeed, seedMask))
+    dbMask = mgf1(seed, ctx.k - HLEN - 1)
+    DB = bytes(a ^ b for a, b in zip(maskedDB, dbMask))
+    i = HLEN
+    while i < len(DB):
+        if DB[i] == 0:
+            i += 1
+        elif DB[i] == 1:
+            i += 1
+            break
+        else:
+            raise ValueError("Invalid padding")
+    return DB[i:]
+
+def xor_unpad_reference(DB, dbMask):
+    """Per-byte XOR and separator loop only (masks precomputed)"""
+    DB = bytes(a ^ b for a, b in zip(bytes(a ^ b for a, b in zip(DB, dbMask)), dbMask))
+    i = HLEN
+    while DB[i] == 0:
+        i += 1
+    return DB[i + 1:]
+
+def xor_unpad_int(DB, dbMask):
+    """Big-integer XOR and bytes.find separator search (masks precomputed)"""
+    length = len(DB)
+    mask = int.from_bytes(dbMask, byteorder='big')
+    DB = ((int.from_bytes(DB, byteorder='big') ^ mask) ^ mask).to_bytes(length, byteorder='big')
+    i = DB.find(b'\x01', HLEN)
+    DB.count(0, HLEN, i)
+    return DB[i + 1:]
+
+def per_call(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+def main():
+    print(f"{'bits':>6} {'op':>7} {'before (us)':>12} {'after (us)':>11} {'speedup':>8}")
+    for bits in KEY_SIZES:
+        # Only the modulus size matters for the codec
+        ctx = OAEPContext(((1 << bits) - 1, 65537))
+        message = os.urandom(ctx.max_message_length)
+        seed = os.urandom(HLEN)
+
+        EM = encode_reference(ctx, message, seed)
+        em_int = ctx.eme_encode(message, seed)
+        assert em_int.to_bytes(ctx.k, byteorder='big') == EM
+        assert ctx.eme_decode(em_int) == decode_reference(ctx, EM) == message
+
+        number = 200
+        rows = (
+            ('encode', lambda: encode_reference(ctx, message, seed), lambda: ctx.eme_encode(message, seed)),
+            ('decode', lambda: decode_reference(ctx, EM), lambda: ctx.eme_decode(em_int)),
+        )
+        for op, before, after in rows:
+            t_before = per_call(before, number)
+            t_after = per_call(after, number)
+            print(f"{bits:>6} {op:>7} {t_before:>12.1f} {t_after:>11.1f} {t_before / t_after:>7.2f}x")
+
+        # XOR masking and separator search alone, without the MGF1 hashing
+        DB = ctx.lhash + b'\x00' * 16 + b'\x01' + os.urandom(ctx.k - 2 * HLEN - 18)
+        dbMask = os.urandom(len(DB))
+        assert xor_unpad_int(DB, dbMask) == xor_unpad_reference(DB, dbMask)
+        t_before = per_call(lambda: xor_unpad_reference(DB, dbMask), number * 10)
+        t_after = per_call(lambda: xor_unpad_int(DB, dbMask), number * 10)
+        print(f"{bits:>6} {'xor':>7} {t_before:>12.1f} {t_after:>11.1f} {t_before / t_after:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Benchmark suite: SHA-256, MGF1, OAEP, key generation and file throughput.
+
+Run from the project root:
+    python -m benchmarks.suite run --out results.json
+    python -m benchmarks.suite run --bits 1024 2048 --quick --out quick.json
+    python -m benchmarks.suite compare before.json after.json
+
+Every measurement is one record {name, bits, unit, value, higher_is_better}
+(bits is null for the key-size independent SHA-256 rows). Throughputs are
+the best of several timed repeats; keygen latency keeps the whole sample
+distribution. compare matches records by (name, bits) and prints the
+relative change, flagging regressions beyond --threshold percent.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import sha256
+from oaep import mgf1, oaep_encrypt, oaep_decrypt
+from rsa import generate_keypair, save_key_to_file, encrypt_file, decrypt_file
+
+KEY_SIZES = (1024, 2048, 3072, 4096)
+# Values of the tunable run options: normal run, and --quick for a fast sanity run.
+# Options given on the command line override both.
+DEFAULTS = dict(repeat=3, min_time=0.2, keygen_samples=5, hash_size=64 * 1024,
+                batch_messages=1024, file_size=256 * 1024)
+QUICK_DEFAULTS = dict(repeat=1, min_time=0.05, keygen_samples=2, hash_size=4 * 1024,
+                      batch_messages=256, file_size=16 * 1024)
+HLEN = 32
+MB = 1024 * 1024
+
+def measure(fn, min_time=0.2, repeat=3):
+    """Best calls per second of fn over `repeat` runs of at least min_time seconds"""
+    best = 0.0
+    for _ in range(repeat):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+def record(name, bits, unit, value, higher_is_better=True, **extra):
+    return dict(name=name, bits=bits, unit=unit, value=value,
+                higher_is_better=higher_is_better, **extra)
+
+def bench_sha256(options, rng):
+    data = rng.randbytes(options.hash_size)
+    assert sha256.sha256(data) == hashlib.sha256(data).digest()
+    custom = measure(lambda: sha256.sha256(data), options.min_time, options.repeat)
+    native = measure(lambda: hashlib.sha256(data).digest(), options.min_time, options.repeat)
+    size_mb = len(data) / MB
+
+    # Many short messages (MGF1 counter blocks, fingerprints): scalar vs multi-lane
+    short = [rng.randbytes(36) for _ in range(options.batch_messages)]
+    scalar = measure(lambda: [sha256.sha256(m) for m in short], options.min_time, options.repeat)
+    lanes = measure(lambda: sha256.digest_many(short), options.min_time, options.repeat)
+    return [
+        record('sha256_custom', None, 'MB/s', custom * size_mb, message_bytes=len(data)),
+        record('sha256_hashlib', None, 'MB/s', native * size_mb, message_bytes=len(data)),
+        record('sha256_scalar_short', None, 'msgs/s', scalar * len(short), messages=len(short)),
+        record('sha256_digest_many', None, 'msgs/s', lanes * len(short), messages=len(short)),
+    ]
+
+def bench_keygen(bits, options):
+    """Latency distribution of generate_keypair; also returns one key pair for reuse"""
+    samples = []
+    keys = None
+    for _ in range(options.keygen_samples):
+        started = time.perf_counter()
+        keys = generate_keypair(bits, workers=options.workers, primes=options.primes)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    summary = dict(
+        samples=samples,
+        min=samples[0],
+        max=samples[-1],
+        mean=statistics.fmean(samples),
+        p90=samples[min(len(samples) - 1, int(0.9 * len(samples)))],
+        stdev=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    )
+    return record('keygen_latency', bits, 's', statistics.median(samples),
+                  higher_is_better=False, workers=options.workers,
+                  primes=options.primes, **summary), keys
+
+def bench_oaep(bits, keys, options, rng):
+    public_key, private_key = keys
+    k = (bits + 7) // 8
+    seed = rng.randbytes(HLEN)
+    message = rng.randbytes(k - 2 * HLEN - 2)
+    ciphertext = oaep_encrypt(message, public_key)
+    assert oaep_decrypt(ciphertext, private_key) == message
+    return [
+        record('mgf1', bits, 'calls/s',
+               measure(lambda: mgf1(seed, k - HLEN - 1), options.min_time, options.repeat)),
+        record('mgf1_custom_sha256', bits, 'calls/s',
+               measure(lambda: mgf1(seed, k - HLEN - 1, 'custom_sha256'), options.min_time, options.repeat)),
+        record('oaep_encrypt', bits, 'ops/s',
+               measure(lambda: oaep_encrypt(message, public_key), options.min_time, options.repeat)),
+        record('oaep_decrypt', bits, 'ops/s',
+               measure(lambda: oaep_decrypt(ciphertext, private_key), options.min_time, options.repeat)),
+    ]
+
+def bench_files(bits, keys, options, rng):
+    public_key, private_key = keys
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        public_key_file = os.path.join(directory, 'public.txt')
+        private_key_file = os.path.join(directory, 'private.txt')
+        save_key_to_file(public_key, public_key_file)
+        save_key_to_file(private_key, private_key_file)
+
+        input_file = os.path.join(directory, 'data.bin')
+        with open(input_file, 'wb') as f:
+            f.write(rng.randbytes(options.file_size))
+        size_mb = options.file_size / MB
+
+        for mode in options.modes:
+            encrypted_file = os.path.join(directory, f'data_{mode}.enc')
+            output_file = os.path.join(directory, f'data_{mode}.bin')
+            # Whole-file operations are slow, so time a few single runs instead of looping
+            encrypt_rate = measure(lambda: encrypt_file(input_file, encrypted_file, public_key_file, mode),
+                                   0, options.repeat)
+            decrypt_rate = measure(lambda: decrypt_file(encrypted_file, output_file, private_key_file),
+                                   0, options.repeat)
+            results.append(record(f'encrypt_file_{mode}', bits, 'MB/s', encrypt_rate * size_mb,
+                                  file_bytes=options.file_size))
+            results.append(record(f'decrypt_file_{mode}', bits, 'MB/s', decrypt_rate * size_mb,
+                                  file_bytes=options.file_size))
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(options):
+    rng = random.Random(options.seed)
+    results = bench_sha256(options, rng)
+    print_records(results)
+    for bits in options.bits:
+        keygen, keys = bench_keygen(bits, options)
+        rows = [keygen] + bench_oaep(bits, keys, options, rng) + bench_files(bits, keys, options, rng)
+        print_records(rows)
+        results.extend(rows)
+
+    report = dict(
+        meta=dict(
+            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            git_revision=git_revision(),
+            python=sys.version.split()[0],
+            implementation=platform.python_implementation(),
+            platform=platform.platform(),
+            cpu_count=os.cpu_count(),
+            options={key: value for key, value in vars(options).items() if key != 'func'},
+        ),
+        results=results,
+    )
+    if options.out:
+        with open(options.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {options.out}")
+    return 0
+
+def print_records(records):
+    for r in records:
+        bits = '-' if r['bits'] is None else r['bits']
+        print(f"{r['name']:>20} {bits:>6} {r['value']:>12.3f} {r['unit']}")
+
+def load_results(filename):
+    with open(filename) as f:
+        return {(r['name'], r['bits']): r for r in json.load(f)['results']}
+
+def compare(options):
+    before = load_results(options.before)
+    after = load_results(options.after)
+    regressions = 0
+    print(f"{'name':>20} {'bits':>6} {'before':>12} {'after':>12} {'change':>8}")
+    for key in sorted(before.keys() & after.keys(), key=lambda key: (key[1] or 0, key[0])):
+        old, new = before[key]['value'], after[key]['value']
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if before[key]['higher_is_better'] else change
+        flag = ' REGRESSION' if worse > options.threshold else ''
+        regressions += bool(flag)
+        bits = '-' if key[1] is None else key[1]
+        print(f"{key[0]:>20} {bits:>6} {old:>12.3f} {new:>12.3f} {change:>+7.1f}%{flag}")
+    for key in sorted(before.keys() ^ after.keys(), key=str):
+        print(f"{key[0]:>20} {key[1] or '-':>6} only in {'before' if key in before else 'after'}")
+    return 1 if regressions and options.fail_on_regression else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="RSA-OAEP benchmark suite")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the benchmarks")
+    run_parser.add_argument('--bits', type=int, nargs='+', default=list(KEY_SIZES))
+    run_parser.add_argument('--out', help="JSON file for the results")
+    run_parser.add_argument('--seed', type=int, default=0, help="seed for the benchmark input data")
+    run_parser.add_argument('--repeat', type=int, help="timed repeats (best is kept)")
+    run_parser.add_argument('--min-time', type=float, help="seconds per timed repeat")
+    run_parser.add_argument('--keygen-samples', type=int)
+    run_parser.add_argument('--workers', type=int, default=None, help="keygen prime search processes")
+    run_parser.add_argument('--primes', type=int, default=2,
+                            help="prime factors per key (compare runs to see the multi-prime gain)")
+    run_parser.add_argument('--hash-size', type=int, help="SHA-256 message bytes")
+    run_parser.add_argument('--batch-messages', type=int, help="short messages per digest_many call")
+    run_parser.add_argument('--file-size', type=int, help="file benchmark bytes")
+    run_parser.add_argument('--modes', nargs='+', default=['block', 'hybrid'])
+    run_parser.add_argument('--quick', action='store_true',
+                            help="fewer samples and smaller inputs, for a fast sanity run")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser('compare', help="compare two result files")
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=5.0,
+                                help="percent change counted as a regression")
+    compare_parser.add_argument('--fail-on-regression', action='store_true')
+    compare_parser.set_defaults(func=compare)
+    return parser
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    if options.command == 'run':
+        defaults = QUICK_DEFAULTS if options.quick else DEFAULTS
+        for name, value in defaults.items():
+            if getattr(options, name) is None:
+                setattr(options, name, value)
+    return options.func(options)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Headless command-line tool for RSA-OAEP key generation and bulk encryption.
+
+Examples (run from the project root):
+    python cli.py keygen --bits 3072 --primes 3 --out keys/ --prefix backup
+    python cli.py encrypt exports/ encrypted/ --key keys/backup_public.txt --mode hybrid --jobs 8
+    python cli.py decrypt encrypted/ restored/ --key keys/backup_private.txt --jobs 8
+    python cli.py decrypt encrypted/ restored/ --keyring keys/
+    python cli.py encrypt huge/ encrypted/ --key keys/backup_public.txt --resume
+
+Directories are processed recursively. Outputs are written to a temporary
+'.part' file and renamed when complete, so an interrupted run never leaves
+a file that looks finished; re-running skips outputs that already exist
+and are newer than their input. With --keyring, each file is decrypted with
+the private key whose fingerprint its header records (compact mode files).
+With --resume (block and compact modes), a file interrupted partway keeps
+its '.part' output and checkpoint journal, and the next run continues from
+the last checkpoint instead of starting the file over.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rsa import (generate_keypair, save_key_to_file, encrypt_stream, decrypt_stream, Keyring,
+                 encrypt_resumable, decrypt_resumable)
+from rsa.file_ops import MODES, RESUMABLE_MODES
+from rsa.rsa import MAX_PRIMES
+from oaep import HASHES, DEFAULT_HASH
+
+ENC_SUFFIX = '.enc'
+PART_SUFFIX = '.part'
+
+def plan_tasks(source, destination, encrypt):
+    """List (input path, output path) pairs, mirroring directory trees"""
+    if os.path.isfile(source):
+        if os.path.isdir(destination):
+            name = os.path.basename(source)
+            if encrypt:
+                name += ENC_SUFFIX
+            elif name.endswith(ENC_SUFFIX):
+                name = name[:-len(ENC_SUFFIX)]
+            destination = os.path.join(destination, name)
+        return [(source, destination)]
+
+    tasks = []
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        relative = os.path.relpath(root, source)
+        for name in sorted(files):
+            if name.endswith(PART_SUFFIX):
+                continue
+            if encrypt:
+                output_name = name + ENC_SUFFIX
+            elif name.endswith(ENC_SUFFIX):
+                output_name = name[:-len(ENC_SUFFIX)]
+            else:
+                continue
+            tasks.append((os.path.join(root, name),
+                          os.path.normpath(os.path.join(destination, relative, output_name))))
+    return tasks
+
+def is_done(input_path, output_path):
+    """An output counts as done if it exists and is not older than its input"""
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    except OSError:
+        return False
+
+def process_file(task):
+    """Encrypt or decrypt one file; runs in a worker process.
+
+    Returns (input path, input bytes, status) with status 'done', 'skipped'
+    or an error message.
+    """
+    input_path, output_path, key_file, encrypt, mode, hash_name, force, resume = task
+    size = os.path.getsize(input_path)
+    if not force and is_done(input_path, output_path):
+        return input_path, size, 'skipped'
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    part_path = output_path + PART_SUFFIX
+    try:
+        if isinstance(key_file, Keyring):
+            key_file = key_file.key_for_file(input_path)
+        if resume:
+            # Continues from the journal of an interrupted run of this file, if any
+            if encrypt:
+                encrypt_resumable(input_path, part_path, key_file, mode, hash_backend=hash_name)
+            else:
+                decrypt_resumable(input_path, part_path, key_file)
+            os.replace(part_path, output_path)
+            return input_path, size, 'done'
+        with open(input_path, 'rb') as f_in, open(part_path, 'wb') as f_out:
+            if encrypt:
+                extension = os.path.splitext(input_path)[1].lower()
+                encrypt_stream(f_in, f_out, key_file, mode=mode, extension=extension,
+                               hash_backend=hash_name)
+            else:
+                decrypt_stream(f_in, f_out, key_file)
+        os.replace(part_path, output_path)
+    except Exception as e:
+        # A resumable run keeps the partial output for the next attempt
+        if not resume and os.path.exists(part_path):
+            os.remove(part_path)
+        return input_path, size, f"error: {e}"
+    return input_path, size, 'done'
+
+def run_batch(args, encrypt):
+    # The keyring index is refreshed once here and shipped to the workers with each task
+    key = Keyring(args.keyring) if getattr(args, 'keyring', None) else args.key
+    tasks = [(src, dst, key, encrypt, getattr(args, 'mode', 'block'),
+              getattr(args, 'hash', None), args.force, args.resume)
+             for src, dst in plan_tasks(args.source, args.destination, encrypt)]
+    if not tasks:
+        print("No input files found")
+        return 0
+
+    started = time.perf_counter()
+    done = skipped = failed = 0
+    processed_bytes = 0
+
+    if args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = pool.map(process_file, tasks)
+            for input_path, size, status in results:
+                done, skipped, failed, processed_bytes = report(
+                    input_path, size, status, args.verbose, done, skipped, failed, processed_bytes)
+    else:
+        for task in tasks:
+            input_path, size, status = process_file(task)
+            done, skipped, failed, processed_bytes = report(
+                input_path, size, status, args.verbose, done, skipped, failed, processed_bytes)
+
+    elapsed = time.perf_counter() - started
+    megabytes = processed_bytes / (1024 * 1024)
+    print(f"{done} processed, {skipped} skipped, {failed} failed in {elapsed:.2f}s")
+    if elapsed > 0:
+        print(f"Throughput: {done / elapsed:.2f} files/s, {megabytes / elapsed:.2f} MB/s")
+    return 1 if failed else 0
+
+def report(input_path, size, status, verbose, done, skipped, failed, processed_bytes):
+    """Print one result line and update the counters"""
+    if status == 'done':
+        done += 1
+        processed_bytes += size
+    elif status == 'skipped':
+        skipped += 1
+    else:
+        failed += 1
+        print(f"{input_path}: {status}", file=sys.stderr)
+    if verbose and not status.startswith('error'):
+        print(f"{input_path}: {status}")
+    return done, skipped, failed, processed_bytes
+
+def run_keygen(args):
+    started = time.perf_counter()
+    public_key, private_key = generate_keypair(args.bits, workers=args.workers, primes=args.primes)
+    os.makedirs(args.out, exist_ok=True)
+    suffix = '.key' if args.binary else '.txt'
+    public_key_file = os.path.join(args.out, f"{args.prefix}_public{suffix}")
+    private_key_file = os.path.join(args.out, f"{args.prefix}_private{suffix}")
+    save_key_to_file(public_key, public_key_file, binary=args.binary)
+    save_key_to_file(private_key, private_key_file, binary=args.binary)
+    print(f"Generated {args.bits}-bit {args.primes}-prime key pair in {time.perf_counter() - started:.2f}s")
+    print(public_key_file)
+    print(private_key_file)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="RSA-OAEP command-line tool")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    keygen = commands.add_parser('keygen', help="generate a key pair")
+    keygen.add_argument('--bits', type=int, default=2048)
+    keygen.add_argument('--out', default='.', help="output directory")
+    keygen.add_argument('--prefix', default='rsa_key', help="key file name prefix")
+    keygen.add_argument('--primes', type=int, default=2, choices=range(2, MAX_PRIMES + 1),
+                        help="number of prime factors (multi-prime keys decrypt faster)")
+    keygen.add_argument('--workers', type=int, default=os.cpu_count(), help="prime search processes")
+    keygen.add_argument('--binary', action='store_true', help="use the compact binary key format")
+
+    for name in ('encrypt', 'decrypt'):
+        command = commands.add_parser(name, help=f"{name} a file or a directory tree")
+        command.add_argument('source', help="input file or directory")
+        command.add_argument('destination', help="output file or directory")
+        if name == 'encrypt':
+            command.add_argument('--key', required=True, help="public key file")
+        else:
+            keys = command.add_mutually_exclusive_group(required=True)
+            keys.add_argument('--key', help="private key file")
+            keys.add_argument('--keyring', help="directory of key files, selected by fingerprint")
+        command.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="files processed in parallel")
+        command.add_argument('--force', action='store_true', help="redo files that are already done")
+        command.add_argument('--resume', action='store_true',
+                             help=f"checkpoint each file and continue interrupted ones ({'/'.join(RESUMABLE_MODES)} files)")
+        command.add_argument('--verbose', '-v', action='store_true')
+        if name == 'encrypt':
+            # compact files record the key fingerprint used by --keyring
+            command.add_argument('--mode', choices=MODES, default='compact')
+            command.add_argument('--hash', choices=sorted(HASHES), default=DEFAULT_HASH,
+                                 help="OAEP hash, recorded in the file header")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'keygen':
+        return run_keygen(args)
+    return run_batch(args, encrypt=args.command == 'encrypt')
+
+if __name__ == "__main__":
+    sys.exit(main())
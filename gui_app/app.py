@@ -1,14 +1,17 @@
 import os
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import traceback
 
 from rsa import (
     generate_keypair, # Generate keypair private and public
     save_key_to_file, # Save key ke file public and private formatnya hexadecimal
     encrypt_file, # Encrypt file pake public key, dari file_ops.py
-    decrypt_file # Decrypt file pake private key, dari file_ops.py
+    decrypt_file, # Decrypt file pake private key, dari file_ops.py
+    OperationCancelled # Raised when the Cancel button stops an operation
 )
+from .worker import BackgroundTask, describe_transfer, format_duration
+
+POLL_INTERVAL_MS = 100  # How often the main thread refreshes the progress of a running task
 
 class RSA_OAEP_App:
     def __init__(self, root):
@@ -45,15 +48,26 @@ class RSA_OAEP_App:
         self.status_var.set("Ready")
         self.status_bar = ttk.Label(self.main_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(fill=tk.X, side=tk.BOTTOM, pady=(10, 0))
+        
+        # Running background tasks, cancelled if the window is closed
+        self.tasks = set()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def setup_keygen_tab(self):
         # Key size options
         ttk.Label(self.keygen_frame, text="Key Size:").grid(row=0, column=0, sticky=tk.W, pady=10)
         self.key_size_var = tk.StringVar(value="2048")
         key_size_combo = ttk.Combobox(self.keygen_frame, textvariable=self.key_size_var, state="readonly")
-        key_size_combo['values'] = ('2048')
+        key_size_combo['values'] = ('2048', '3072', '4096')
         key_size_combo.grid(row=0, column=1, sticky=tk.W, padx=5)
         
+        # Number of primes (more primes: faster decryption, see generate_keypair)
+        self.key_primes_var = tk.StringVar(value="2 primes")
+        key_primes_combo = ttk.Combobox(self.keygen_frame, textvariable=self.key_primes_var,
+                                        state="readonly", width=10)
+        key_primes_combo['values'] = ('2 primes', '3 primes', '4 primes')
+        key_primes_combo.grid(row=0, column=2, sticky=tk.W, padx=5)
+        
         # Output directory
         ttk.Label(self.keygen_frame, text="Output Directory:").grid(row=1, column=0, sticky=tk.W, pady=10)
         self.output_dir_var = tk.StringVar()
@@ -65,12 +79,17 @@ class RSA_OAEP_App:
         self.key_prefix_var = tk.StringVar(value="rsa_key")
         ttk.Entry(self.keygen_frame, textvariable=self.key_prefix_var, width=50).grid(row=2, column=1, sticky=tk.W+tk.E, padx=5)
         
-        # Generate button
-        ttk.Button(self.keygen_frame, text="Generate Key Pair", command=self.generate_keys).grid(row=3, column=1, pady=20)
+        # Generate and cancel buttons
+        self.keygen_button = ttk.Button(self.keygen_frame, text="Generate Key Pair", command=self.generate_keys)
+        self.keygen_button.grid(row=3, column=1, pady=20)
+        self.keygen_cancel = ttk.Button(self.keygen_frame, text="Cancel", state=tk.DISABLED)
+        self.keygen_cancel.grid(row=3, column=2, pady=20)
         
-        # Progress bar
-        self.keygen_progress = ttk.Progressbar(self.keygen_frame, orient=tk.HORIZONTAL, length=200, mode='indeterminate')
+        # Progress bar (primes found) and progress details
+        self.keygen_progress = ttk.Progressbar(self.keygen_frame, orient=tk.HORIZONTAL, length=200, mode='determinate')
         self.keygen_progress.grid(row=4, column=0, columnspan=3, sticky=tk.W+tk.E, pady=10)
+        self.keygen_info_var = tk.StringVar()
+        ttk.Label(self.keygen_frame, textvariable=self.keygen_info_var).grid(row=5, column=0, columnspan=3, sticky=tk.W)
         
         # Configure grid
         self.keygen_frame.columnconfigure(1, weight=1)
@@ -94,12 +113,21 @@ class RSA_OAEP_App:
         ttk.Entry(self.encrypt_frame, textvariable=self.encrypt_output_var, width=50).grid(row=2, column=1, sticky=tk.W+tk.E, padx=5)
         ttk.Button(self.encrypt_frame, text="Browse...", command=self.browse_encrypt_output).grid(row=2, column=2, padx=5)
         
-        # Encrypt button
-        ttk.Button(self.encrypt_frame, text="Encrypt", command=self.encrypt).grid(row=3, column=1, pady=20)
+        # Hybrid mode (one RSA-OAEP call per file, symmetric stream for the data)
+        self.encrypt_hybrid_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.encrypt_frame, text="Hybrid mode (faster for large files)", variable=self.encrypt_hybrid_var).grid(row=3, column=1, sticky=tk.W, padx=5)
         
-        # Progress bar
-        self.encrypt_progress = ttk.Progressbar(self.encrypt_frame, orient=tk.HORIZONTAL, length=200, mode='indeterminate')
-        self.encrypt_progress.grid(row=4, column=0, columnspan=3, sticky=tk.W+tk.E, pady=10)
+        # Encrypt and cancel buttons
+        self.encrypt_button = ttk.Button(self.encrypt_frame, text="Encrypt", command=self.encrypt)
+        self.encrypt_button.grid(row=4, column=1, pady=20)
+        self.encrypt_cancel = ttk.Button(self.encrypt_frame, text="Cancel", state=tk.DISABLED)
+        self.encrypt_cancel.grid(row=4, column=2, pady=20)
+        
+        # Progress bar (bytes processed) and progress details
+        self.encrypt_progress = ttk.Progressbar(self.encrypt_frame, orient=tk.HORIZONTAL, length=200, mode='determinate')
+        self.encrypt_progress.grid(row=5, column=0, columnspan=3, sticky=tk.W+tk.E, pady=10)
+        self.encrypt_info_var = tk.StringVar()
+        ttk.Label(self.encrypt_frame, textvariable=self.encrypt_info_var).grid(row=6, column=0, columnspan=3, sticky=tk.W)
         
         # Configure grid
         self.encrypt_frame.columnconfigure(1, weight=1)
@@ -123,12 +151,17 @@ class RSA_OAEP_App:
         ttk.Entry(self.decrypt_frame, textvariable=self.decrypt_output_var, width=50).grid(row=2, column=1, sticky=tk.W+tk.E, padx=5)
         ttk.Button(self.decrypt_frame, text="Browse...", command=self.browse_decrypt_output).grid(row=2, column=2, padx=5)
         
-        # Decrypt button
-        ttk.Button(self.decrypt_frame, text="Decrypt", command=self.decrypt).grid(row=3, column=1, pady=20)
+        # Decrypt and cancel buttons
+        self.decrypt_button = ttk.Button(self.decrypt_frame, text="Decrypt", command=self.decrypt)
+        self.decrypt_button.grid(row=3, column=1, pady=20)
+        self.decrypt_cancel = ttk.Button(self.decrypt_frame, text="Cancel", state=tk.DISABLED)
+        self.decrypt_cancel.grid(row=3, column=2, pady=20)
         
-        # Progress bar
-        self.decrypt_progress = ttk.Progressbar(self.decrypt_frame, orient=tk.HORIZONTAL, length=200, mode='indeterminate')
+        # Progress bar (bytes processed) and progress details
+        self.decrypt_progress = ttk.Progressbar(self.decrypt_frame, orient=tk.HORIZONTAL, length=200, mode='determinate')
         self.decrypt_progress.grid(row=4, column=0, columnspan=3, sticky=tk.W+tk.E, pady=10)
+        self.decrypt_info_var = tk.StringVar()
+        ttk.Label(self.decrypt_frame, textvariable=self.decrypt_info_var).grid(row=5, column=0, columnspan=3, sticky=tk.W)
         
         # Configure grid
         self.decrypt_frame.columnconfigure(1, weight=1)
@@ -178,10 +211,75 @@ class RSA_OAEP_App:
         if filename:
             self.decrypt_output_var.set(filename)
     
+    # Background tasks
+    def start_task(self, task, controls, describe, on_success, on_error):
+        """Start a BackgroundTask and poll it from the Tk main loop
+
+        controls: (progress bar, info StringVar, start button, cancel button)
+        describe(progress_values, elapsed) returns (percent, info text)
+        """
+        progress_bar, info_var, start_button, cancel_button = controls
+        progress_bar['value'] = 0
+        info_var.set("")
+        start_button.config(state=tk.DISABLED)
+        cancel_button.config(state=tk.NORMAL, command=task.cancel)
+        self.tasks.add(task)
+        task.start()
+        self.root.after(POLL_INTERVAL_MS, self.poll_task, task, controls, describe, on_success, on_error)
+    
+    def poll_task(self, task, controls, describe, on_success, on_error):
+        progress_bar, info_var, start_button, cancel_button = controls
+        
+        if task.progress is not None:
+            percent, text = describe(task.progress, task.elapsed)
+            progress_bar['value'] = percent
+            info_var.set(text)
+        
+        if not task.done:
+            if task.cancel_event.is_set():
+                self.status_var.set("Cancelling...")
+            self.root.after(POLL_INTERVAL_MS, self.poll_task, task, controls, describe, on_success, on_error)
+            return
+        
+        # Finished: restore the buttons and report the outcome
+        self.tasks.discard(task)
+        start_button.config(state=tk.NORMAL)
+        cancel_button.config(state=tk.DISABLED)
+        
+        if task.error is None:
+            progress_bar['value'] = 100
+            on_success(task.result)
+        elif isinstance(task.error, OperationCancelled):
+            progress_bar['value'] = 0
+            info_var.set("Cancelled, partial output removed")
+            self.status_var.set("Cancelled")
+        else:
+            on_error(task)
+    
+    def on_close(self):
+        # Stop running tasks so they can remove their partial output before exiting
+        for task in list(self.tasks):
+            task.cancel()
+        for task in list(self.tasks):
+            task.thread.join(timeout=5)
+        self.root.destroy()
+    
+    @staticmethod
+    def describe_file_progress(progress, elapsed):
+        blocks, bytes_done, total = progress
+        percent = 100.0 * bytes_done / total if total else 100.0
+        return percent, describe_transfer(blocks, bytes_done, total, elapsed)
+    
+    @staticmethod
+    def describe_keygen_progress(progress, elapsed):
+        found, count = progress
+        return 100.0 * found / count, f"{found} / {count} primes found ({format_duration(elapsed)})"
+    
     # Core functionality
     def generate_keys(self):
         # Get parameters
         key_size = int(self.key_size_var.get())
+        primes = int(self.key_primes_var.get().split()[0])
         output_dir = self.output_dir_var.get()
         key_prefix = self.key_prefix_var.get()
         
@@ -189,38 +287,36 @@ class RSA_OAEP_App:
             messagebox.showerror("Error", "Please select an output directory")
             return
         
-        # Start progress bar
-        self.keygen_progress.start()
         self.status_var.set("Generating keys... This may take a while.")
-        self.root.update_idletasks()
         
-        # Generate keys in a separate thread to avoid freezing the UI
-        self.root.after(100, self.do_generate_keys, key_size, output_dir, key_prefix)
+        # Generate keys on a worker thread so the UI stays responsive
+        task = BackgroundTask(self.do_generate_keys, key_size, primes, output_dir, key_prefix)
+        controls = (self.keygen_progress, self.keygen_info_var, self.keygen_button, self.keygen_cancel)
+        self.start_task(task, controls, self.describe_keygen_progress,
+                        self.keys_generated, self.keygen_failed)
+    
+    def do_generate_keys(self, key_size, primes, output_dir, key_prefix, progress=None, cancel=None):
+        # Runs on the worker thread: no Tk calls here
+        # Generate key pair, searching for the primes on all CPU cores
+        public_key, private_key = generate_keypair(key_size, workers=os.cpu_count(),
+                                                   progress=progress, cancel=cancel, primes=primes)
+        
+        # Save keys to files
+        public_key_file = os.path.join(output_dir, f"{key_prefix}_public.txt")
+        private_key_file = os.path.join(output_dir, f"{key_prefix}_private.txt")
+        
+        save_key_to_file(public_key, public_key_file)
+        save_key_to_file(private_key, private_key_file)
+        return public_key_file, private_key_file
+    
+    def keys_generated(self, key_files):
+        public_key_file, private_key_file = key_files
+        self.status_var.set("Keys generated successfully")
+        messagebox.showinfo("Success", f"Keys generated and saved to:\n{public_key_file}\n{private_key_file}")
     
-    def do_generate_keys(self, key_size, output_dir, key_prefix):
-        try:
-            # Generate key pair
-            public_key, private_key = generate_keypair(key_size)
-            
-            # Save keys to files
-            public_key_file = os.path.join(output_dir, f"{key_prefix}_public.txt")
-            private_key_file = os.path.join(output_dir, f"{key_prefix}_private.txt")
-            
-            save_key_to_file(public_key, public_key_file)
-            save_key_to_file(private_key, private_key_file)
-            
-            # Stop progress bar
-            self.keygen_progress.stop()
-            self.status_var.set("Keys generated successfully")
-            
-            messagebox.showinfo("Success", f"Keys generated and saved to:\n{public_key_file}\n{private_key_file}")
-        
-        except Exception as e:
-            # Stop progress bar
-            self.keygen_progress.stop()
-            self.status_var.set("Error generating keys")
-            
-            messagebox.showerror("Error", f"Failed to generate keys: {str(e)}")
+    def keygen_failed(self, task):
+        self.status_var.set("Error generating keys")
+        messagebox.showerror("Error", f"Failed to generate keys: {str(task.error)}")
     
     def encrypt(self):
         # Get parameters
@@ -232,31 +328,24 @@ class RSA_OAEP_App:
             messagebox.showerror("Error", "Please select all required files")
             return
         
-        # Start progress bar
-        self.encrypt_progress.start()
         self.status_var.set("Encrypting... This may take a while.")
-        self.root.update_idletasks()
         
-        # Encrypt in a separate thread
-        self.root.after(100, self.do_encrypt, input_file, key_file, output_file)
+        # Compact files record the key fingerprint, so a keyring can pick the private key
+        mode = 'hybrid' if self.encrypt_hybrid_var.get() else 'compact'
+        
+        # Encrypt on a worker thread; a cancelled run removes the partial output
+        task = BackgroundTask(encrypt_file, input_file, output_file, key_file, mode)
+        controls = (self.encrypt_progress, self.encrypt_info_var, self.encrypt_button, self.encrypt_cancel)
+        self.start_task(task, controls, self.describe_file_progress,
+                        lambda result: self.encrypted(output_file), self.encrypt_failed)
+    
+    def encrypted(self, output_file):
+        self.status_var.set("File encrypted successfully")
+        messagebox.showinfo("Success", f"File encrypted and saved to:\n{output_file}")
     
-    def do_encrypt(self, input_file, key_file, output_file):
-        try:
-            # Encrypt file
-            encrypt_file(input_file, output_file, key_file)
-            
-            # Stop progress bar
-            self.encrypt_progress.stop()
-            self.status_var.set("File encrypted successfully")
-            
-            messagebox.showinfo("Success", f"File encrypted and saved to:\n{output_file}")
-        
-        except Exception as e:
-            # Stop progress bar
-            self.encrypt_progress.stop()
-            self.status_var.set("Error encrypting file")
-            
-            messagebox.showerror("Error", f"Failed to encrypt file: {str(e)}")
+    def encrypt_failed(self, task):
+        self.status_var.set("Error encrypting file")
+        messagebox.showerror("Error", f"Failed to encrypt file: {str(task.error)}")
     
     def decrypt(self):
         # Get parameters
@@ -268,40 +357,30 @@ class RSA_OAEP_App:
             messagebox.showerror("Error", "Please select all required files")
             return
         
-        # Start progress bar
-        self.decrypt_progress.start()
         self.status_var.set("Decrypting... This may take a while.")
-        self.root.update_idletasks()
         
-        # Decrypt in a separate thread
-        self.root.after(100, self.do_decrypt, input_file, key_file, output_file)
+        # Decrypt on a worker thread; a cancelled run removes the partial output
+        task = BackgroundTask(decrypt_file, input_file, output_file, key_file)
+        controls = (self.decrypt_progress, self.decrypt_info_var, self.decrypt_button, self.decrypt_cancel)
+        self.start_task(task, controls, self.describe_file_progress,
+                        self.decrypted, self.decrypt_failed)
     
-    def do_decrypt(self, input_file, key_file, output_file):
-        try:
-            # Decrypt file (may return a modified output filename)
-            actual_output_file = decrypt_file(input_file, output_file, key_file)
-            
-            # Update the output filename in the GUI if it was changed
-            if actual_output_file != output_file:
-                self.decrypt_output_var.set(actual_output_file)
-                output_file = actual_output_file
-            
-            # Stop progress bar
-            self.decrypt_progress.stop()
-            self.status_var.set("File decrypted successfully")
-            
-            messagebox.showinfo("Success", f"File decrypted and saved to:\n{output_file}")
-        
-        except Exception as e:
-            # Stop progress bar
-            self.decrypt_progress.stop()
-            self.status_var.set(f"Error decrypting file: {str(e)}")
-            
-            # Show detailed error message
-            error_details = traceback.format_exc()
-            
-            messagebox.showerror("Error", f"Failed to decrypt file: {str(e)}\n\nDetails: {error_details}")
-            
-            # Log error to console
-            print("Decryption error details:")
-            print(error_details)
\ No newline at end of file
+    def decrypted(self, actual_output_file):
+        # Update the output filename in the GUI if it was changed
+        if actual_output_file != self.decrypt_output_var.get():
+            self.decrypt_output_var.set(actual_output_file)
+        
+        self.status_var.set("File decrypted successfully")
+        messagebox.showinfo("Success", f"File decrypted and saved to:\n{actual_output_file}")
+    
+    def decrypt_failed(self, task):
+        self.status_var.set(f"Error decrypting file: {str(task.error)}")
+        
+        # Show detailed error message
+        error_details = task.error_details
+        
+        messagebox.showerror("Error", f"Failed to decrypt file: {str(task.error)}\n\nDetails: {error_details}")
+        
+        # Log error to console
+        print("Decryption error details:")
+        print(error_details)
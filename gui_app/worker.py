@@ -0,0 +1,76 @@
+import threading
+import time
+import traceback
+
+class BackgroundTask:
+    """Runs a long operation on a daemon thread.
+
+    The function is called as func(*args, progress=..., cancel=...), so it
+    must accept the progress callback and cancel event used by
+    generate_keypair, encrypt_file and decrypt_file. The worker thread never
+    touches Tk widgets: it only stores the latest progress values, and the
+    main thread polls them with root.after().
+    """
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+        self.cancel_event = threading.Event()
+        self.finished = threading.Event()
+        self.progress = None  # Latest values passed to the progress callback
+        self.result = None
+        self.error = None
+        self.error_details = None
+        self.started = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self.func(*self.args, progress=self.report, cancel=self.cancel_event)
+        except BaseException as e:
+            self.error = e
+            self.error_details = traceback.format_exc()
+        finally:
+            self.finished.set()
+
+    def report(self, *values):
+        # Replacing the tuple is atomic, so the main thread always sees a consistent snapshot
+        self.progress = values
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def done(self):
+        return self.finished.is_set()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started if self.started else 0.0
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+def transfer_stats(bytes_done, total, elapsed):
+    """Percentage, MB/s and ETA (seconds, or None if unknown) for a file operation"""
+    percent = 100.0 * bytes_done / total if total else 100.0
+    rate = bytes_done / elapsed if elapsed > 0 else 0.0
+    eta = (total - bytes_done) / rate if rate > 0 else None
+    return percent, rate / (1024 * 1024), eta
+
+def describe_transfer(blocks, bytes_done, total, elapsed):
+    """One-line progress text: blocks, bytes, MB/s and ETA"""
+    percent, mb_per_second, eta = transfer_stats(bytes_done, total, elapsed)
+    eta_text = format_duration(eta) if eta is not None else "--:--"
+    return (f"{blocks} blocks, {bytes_done / (1024 * 1024):.2f} / {total / (1024 * 1024):.2f} MB "
+            f"({percent:.0f}%), {mb_per_second:.2f} MB/s, ETA {eta_text}")
@@ -1,3 +1,26 @@
-from .oaep import mgf1, oaep_encrypt, oaep_decrypt
+from . import instrument
+from .hashes import HashBackend, HASHES, DEFAULT_HASH, register_hash, get_hash, hash_from_id
+from .oaep import (
+    mgf1,
+    OAEPContext,
+    oaep_encrypt,
+    oaep_decrypt,
+    oaep_encrypt_many,
+    oaep_decrypt_many,
+)
 
-__all__ = ['mgf1', 'oaep_encrypt', 'oaep_decrypt']
\ No newline at end of file
+__all__ = [
+    'instrument',
+    'HashBackend',
+    'HASHES',
+    'DEFAULT_HASH',
+    'register_hash',
+    'get_hash',
+    'hash_from_id',
+    'mgf1',
+    'OAEPContext',
+    'oaep_encrypt',
+    'oaep_decrypt',
+    'oaep_encrypt_many',
+    'oaep_decrypt_many',
+]
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""Registry backend hash untuk OAEP, MGF1 dan format file.
+
+Backend yang tersedia:
+    'sha256'         SHA-256 dari hashlib (C, default untuk produksi)
+    'custom_sha256'  SHA-256 pure-Python dari package sha256 (referensi,
+                     hasilnya dicek silang dengan hashlib di test)
+    'sha384'         SHA-384 dari hashlib
+    'sha512'         SHA-512 dari hashlib
+
+Backend dengan algoritma yang sama menghasilkan ciphertext yang kompatibel,
+jadi yang dicatat di header file adalah id algoritmanya (HASH_IDS), bukan
+implementasinya.
+"""
+
+import hashlib
+
+import sha256
+
+# Id algoritma hash di header file; SHA-256 = 0 supaya file lama tetap valid
+HASH_IDS = {'sha256': 0, 'sha384': 1, 'sha512': 2}
+
+DEFAULT_HASH = 'sha256'
+
+def mgf1_custom_sha256(seed, length):
+    """MGF1 dengan custom SHA-256
+
+    Seed pendek dengan banyak blok output (dbMask) di-hash multi-lane dengan
+    sha256.digest_many. Selain itu, blok penuh (64 byte) dari seed hanya
+    dikompres sekali (midstate), lalu setiap counter cukup mengompres blok
+    sisa yang sudah dipadding, dengan 4 byte counter ditulis langsung ke
+    template blok tersebut."""
+    hlen = 32  # Digest size untuk SHA-256
+    blocks = (length + hlen - 1) // hlen
+    
+    if blocks > 1 and len(seed) < 64:
+        # Semua counter block di-compress bersamaan, satu lane per counter
+        inputs = [seed + counter.to_bytes(4, byteorder='big') for counter in range(blocks)]
+        return b''.join(sha256.digest_many(inputs))[:length]
+
+    # Midstate: kompres blok penuh dari seed sekali saja
+    prefix_len = len(seed) - len(seed) % 64
+    midstate = sha256.H0
+    for chunk_start in range(0, prefix_len, 64):
+        midstate = sha256.compress(midstate, seed[chunk_start:chunk_start + 64])
+
+    # Template blok sisa: sisa seed || C || 0x80 || nol || panjang pesan (bit)
+    tail = bytearray(seed[prefix_len:])
+    counter_pos = len(tail)
+    tail += b'\x00\x00\x00\x00\x80'
+    tail += b'\x00' * ((56 - len(tail)) % 64)
+    tail += ((len(seed) + 4) * 8).to_bytes(8, byteorder='big')
+
+    # Jika blok sisa hanya satu chunk dan counter jatuh di batas word (misalnya
+    # seed 32 byte untuk dbMask), ronde yang hanya bergantung seed dihitung sekali
+    rounds = None
+    if len(tail) == 64 and counter_pos % 4 == 0:
+        rounds = sha256.precompute_rounds(midstate, tail[:counter_pos])
+
+    # Buffer output dialokasikan sekali
+    T = bytearray(blocks * hlen)
+    for counter in range(blocks):
+        tail[counter_pos:counter_pos + 4] = counter.to_bytes(4, byteorder='big')
+        if rounds is not None:
+            state = sha256.compress(midstate, tail, rounds)
+        else:
+            state = midstate
+            for chunk_start in range(0, len(tail), 64):
+                state = sha256.compress(state, tail[chunk_start:chunk_start + 64])
+        offset = counter * hlen
+        for val in state:
+            T[offset:offset + 4] = val.to_bytes(4, byteorder='big')
+            offset += 4
+
+    return bytes(T[:length])
+
+class HashBackend:
+    """Satu implementasi hash: nama, algoritma, ukuran digest, dan MGF1-nya
+
+    new: konstruktor hasher dengan interface hashlib (update/copy/digest)
+    mgf1: MGF1 khusus (opsional); default-nya MGF1 generik di atas new()
+    """
+
+    def __init__(self, name, algorithm, digest_size, new, mgf1=None):
+        self.name = name
+        self.algorithm = algorithm
+        self.hash_id = HASH_IDS[algorithm]
+        self.digest_size = digest_size
+        self.new = new
+        if mgf1 is not None:
+            self.mgf1 = mgf1
+
+    def digest(self, data):
+        return self.new(data).digest()
+
+    def mgf1(self, seed, length):
+        """MGF1 generik: hasher untuk seed dibuat sekali lalu di-copy per counter"""
+        hlen = self.digest_size
+        prefix = self.new(seed)
+        blocks = (length + hlen - 1) // hlen
+        T = bytearray(blocks * hlen)
+        for counter in range(blocks):
+            h = prefix.copy()
+            h.update(counter.to_bytes(4, byteorder='big'))
+            T[counter * hlen:(counter + 1) * hlen] = h.digest()
+        return bytes(T[:length])
+
+    def __repr__(self):
+        return f"HashBackend({self.name!r})"
+
+HASHES = {}
+
+def register_hash(backend):
+    """Daftarkan backend hash (menimpa backend dengan nama yang sama)"""
+    HASHES[backend.name] = backend
+    return backend
+
+def get_hash(hash_backend=None):
+    """Ambil backend dari nama atau objeknya; None berarti DEFAULT_HASH"""
+    if isinstance(hash_backend, HashBackend):
+        return hash_backend
+    name = hash_backend or DEFAULT_HASH
+    try:
+        return HASHES[name]
+    except KeyError:
+        raise ValueError(f"Unknown hash backend: {name}") from None
+
+def hash_from_id(hash_id):
+    """Backend untuk id algoritma dari header file (implementasi hashlib)"""
+    for algorithm, known_id in HASH_IDS.items():
+        if known_id == hash_id:
+            return get_hash(algorithm)
+    raise ValueError(f"Unsupported hash id in header: {hash_id}")
+
+register_hash(HashBackend('sha256', 'sha256', 32, hashlib.sha256))
+register_hash(HashBackend('custom_sha256', 'sha256', 32, sha256.new, mgf1_custom_sha256))
+register_hash(HashBackend('sha384', 'sha384', 48, hashlib.sha384))
+register_hash(HashBackend('sha512', 'sha512', 64, hashlib.sha512))
@@ -0,0 +1,93 @@
+"""Instrumentasi opsional per tahap pipeline RSA-OAEP.
+
+Secara default tidak aktif: setiap titik ukur hanya memeriksa
+`instrument.active is None`, jadi biayanya praktis nol. Aktifkan dengan
+context manager:
+
+    from oaep import instrument
+    with instrument.collect() as metrics:
+        encrypt_file(...)
+    print(metrics.as_dict())
+
+atau dengan callback yang menerima dict hasil saat blok selesai:
+
+    with instrument.collect(callback=send_to_metrics_system):
+        ...
+
+Nama metrik berbentuk "<tahap>.<ukuran>":
+    hash.calls, hash.bytes         panggilan SHA-256 (MGF1, label hash saat cache miss) dan byte yang di-hash
+    hash.label_lookups             label hash yang diminta (satu per OAEPContext, termasuk cache hit)
+    mgf1.calls, mgf1.blocks        panggilan MGF1 dan blok digest (hlen byte) yang dihasilkan
+    mgf1.seconds                   waktu di dalam MGF1
+    eme.encodes, eme.decodes       jumlah encode/decode EME-OAEP
+    eme.seconds                    waktu encode/decode (termasuk MGF1; sisanya XOR masking)
+    modexp.count, modexp.seconds   operasi pow() / dekripsi CRT
+    blocks.encrypted, blocks.decrypted
+    hybrid.chunks                  chunk simetris di mode hybrid
+    io.read_bytes, io.read_seconds, io.write_bytes, io.write_seconds
+
+Pengukuran berlaku untuk seluruh proses (semua thread). Pekerjaan di
+process pool (workers > 1) tidak ikut terhitung, kecuali I/O di proses utama.
+"""
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Kolektor yang sedang aktif; None berarti instrumentasi mati
+active = None
+
+class Metrics:
+    """Kumpulan counter dan timer (detik) per nama metrik"""
+
+    def __init__(self):
+        self._values = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, name, amount=1):
+        """Tambahkan amount ke metrik name (counter atau detik)"""
+        with self._lock:
+            self._values[name] += amount
+
+    def add_many(self, *pairs):
+        """Tambahkan beberapa (name, amount) sekaligus dengan satu lock"""
+        with self._lock:
+            values = self._values
+            for name, amount in pairs:
+                values[name] += amount
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def as_dict(self):
+        """Salinan semua metrik, siap diteruskan ke sistem metrics"""
+        with self._lock:
+            return dict(sorted(self._values.items()))
+
+    def __getitem__(self, name):
+        with self._lock:
+            return self._values.get(name, 0)
+
+def enable(metrics=None):
+    """Aktifkan instrumentasi dan kembalikan kolektornya"""
+    global active
+    active = metrics if metrics is not None else Metrics()
+    return active
+
+def disable():
+    global active
+    active = None
+
+@contextmanager
+def collect(metrics=None, callback=None):
+    """Aktifkan instrumentasi selama blok with; callback(dict) dipanggil di akhir"""
+    global active
+    previous = active
+    current = enable(metrics)
+    try:
+        yield current
+    finally:
+        active = previous
+        if callback is not None:
+            callback(current.as_dict())
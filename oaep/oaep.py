@@ -1,134 +1,220 @@
 import os
-import sha256
+from functools import lru_cache
+from time import perf_counter
+from . import instrument
+from .hashes import get_hash
 
-def mgf1(seed, length):
-    """Fungsi Mask Generation Function berbasis SHA-256
-    Source: https://en.wikipedia.org/wiki/Mask_generation_function"""
-    hlen = 32  # Digest size untuk SHA-256 
+def mgf1(seed, length, hash_backend=None):
+    """Fungsi Mask Generation Function (MGF1)
+    Source: https://en.wikipedia.org/wiki/Mask_generation_function
+
+    hash_backend: nama atau HashBackend dari registry (default SHA-256 hashlib)"""
+    backend = get_hash(hash_backend)
+    hlen = backend.digest_size
     if length > (2**32) * hlen:
         raise ValueError("Mask too long")
     
-    T = b""
-    counter = 0
-    while len(T) < length:
-        C = counter.to_bytes(4, byteorder='big')
-        hasher = sha256.new()
-        hasher.update(seed + C)
-        T += hasher.digest()
-        counter += 1
-    
-    return T[:length]
+    metrics = instrument.active
+    if metrics is None:
+        return backend.mgf1(seed, length)
+    
+    started = perf_counter()
+    mask = backend.mgf1(seed, length)
+    blocks = (length + hlen - 1) // hlen
+    metrics.add_many(('mgf1.calls', 1), ('mgf1.blocks', blocks),
+                     ('hash.calls', blocks), ('hash.bytes', blocks * (len(seed) + 4)),
+                     ('mgf1.seconds', perf_counter() - started))
+    return mask
 
-def oaep_encrypt(message, key, label=b""):
-    """Fungsi enkripsi RSA-OAEP menggunakan SHA-256
-    Source: https://en.wikipedia.org/wiki/Optimal_asymmetric_encryption_padding#Encoding"""
-    n, e = key
-    k = (n.bit_length() + 7) // 8  # Panjang modulus RSA dalam bytes
+@lru_cache(maxsize=128)
+def _cached_label_hash(label, hash_backend):
+    # Hanya berjalan saat cache miss, jadi hash.calls hanya menghitung hash yang benar-benar dihitung
+    if instrument.active is not None:
+        instrument.active.add_many(('hash.calls', 1), ('hash.bytes', len(label)))
+    return get_hash(hash_backend).digest(label)
 
-    hlen = 32 # Digest size untuk SHA-256 
-    mlen = len(message)
-    
-    # Periksa panjang pesan
-    if mlen > k - 2 * hlen - 2:
-        raise ValueError("Message too long")
-    
-    # Hash label menggunakan SHA-256
-    hasher = sha256.new()
-    hasher.update(label)
-    lhash = hasher.digest()
-    
-    # Buat pesan yang dipadding (DB = lHash || PS || 0x01 || M)
-    PS = b'\x00' * (k - mlen - 2 * hlen - 2)
-    DB = lhash + PS + b'\x01' + message ##
-    
-    # Generate seed random
-    seed = os.urandom(hlen)
-    
-    # Menggunakan mgf1 untuk generate mask db
-    dbMask = mgf1(seed, k - hlen - 1)
-    
-    # Mask DB dengan dbMask (maskedDB = DB XOR dbMask)
-    maskedDB = bytes(a ^ b for a, b in zip(DB, dbMask))
-    
-    # Menggunakan mgf1 untuk generate mask seed
-    seedMask = mgf1(maskedDB, hlen)
-    
-    # Mask seed dengan dbMask (maskedSeed = seed XOR seedMask)
-    maskedSeed = bytes(a ^ b for a, b in zip(seed, seedMask))
-    
-    # Membuat encoded message (EM = 0x00 || maskedSeed || maskedDB)
-    EM = b'\x00' + maskedSeed + maskedDB
-    
-    # Ubah ke int dan lakukan enkripsi RSA
-    m_int = int.from_bytes(EM, byteorder='big')
-    c_int = pow(m_int, e, n)
-    
-    # Ubah ciphertext ke bytes
-    ciphertext = c_int.to_bytes(k, byteorder='big')
-    
-    return ciphertext
+def label_hash(label, hash_backend=None):
+    """Hash label (di-cache, label default b"" cukup dihitung sekali per hash)
 
-def oaep_decrypt(ciphertext, key, label=b""):
-    """RSA-OAEP Decryption using SHA-256
-    Source: https://en.wikipedia.org/wiki/Optimal_asymmetric_encryption_padding#Decoding"""
-    n, d = key
-    k = (n.bit_length() + 7) // 8  # Panjang modulus RSA dalam bytes
-    
-    hlen = 32 # Digest size untuk SHA-256 
-    
-    # Periksa panjang ciphertext
-    if len(ciphertext) != k:
-        raise ValueError("Decryption error: Invalid ciphertext length")
-    
-    # Ubah ke int dan lakukan dekripsi RSA
-    c_int = int.from_bytes(ciphertext, byteorder='big')
-    m_int = pow(c_int, d, n)
-    
-    # Ubah kembali ke bytes
-    EM = m_int.to_bytes(k, byteorder='big')
-    
-    # Memisahkan komponen
-    first_byte = EM[0]
-    maskedSeed = EM[1:1+hlen]
-    maskedDB = EM[1+hlen:]
-    
-    # Periksa byte pertama
-    if first_byte != 0:
-        raise ValueError("Decryption error: Invalid padding")
+    Setiap pemanggilan dicatat sebagai hash.label_lookups, hit maupun miss."""
+    if instrument.active is not None:
+        instrument.active.add('hash.label_lookups')
+    return _cached_label_hash(label, hash_backend)
+
+label_hash.cache_clear = _cached_label_hash.cache_clear
+
+class OAEPContext:
+    """Konteks RSA-OAEP untuk satu kunci dan satu label.
+
+    k, hlen, lhash dan komponen kunci dihitung sekali saat konteks dibuat,
+    sehingga enkripsi/dekripsi berulang dengan kunci yang sama tidak perlu
+    setup ulang. key bisa public key (n, e) untuk enkripsi atau private key
+    (n, d) / CRTPrivateKey untuk dekripsi. hash_backend memilih hash untuk
+    label dan MGF1 (nama di registry oaep.hashes, default SHA-256).
+    """
+    
+    def __init__(self, key, label=b"", hash_backend=None):
+        self.key = key
+        self.n, self.exponent = key
+        self.hash = get_hash(hash_backend)
+        self.k = (self.n.bit_length() + 7) // 8  # Panjang modulus RSA dalam bytes
+        self.hlen = self.hash.digest_size
+        self.max_message_length = self.k - 2 * self.hlen - 2
+        if self.max_message_length < 0:
+            raise ValueError(f"Key too small for OAEP with {self.hash.name}")
         
-    # Menggunakan mgf1 untuk generate mask seed
-    seedMask = mgf1(maskedDB, hlen)
-    
-    # Recover seed (seed = maskedSeed XOR seedMask)
-    seed = bytes(a ^ b for a, b in zip(maskedSeed, seedMask))
-    
-    # Menggunakan mgf1 untuk generate mask db
-    dbMask = mgf1(seed, k - hlen - 1)
-    
-    # Recover DB (DB = maskedDB XOR dbMask)
-    DB = bytes(a ^ b for a, b in zip(maskedDB, dbMask))
-    
-    # Hash label menggunakan SHA-256
-    hasher = sha256.new()
-    hasher.update(label)
-    lhash = hasher.digest()
-    
-    # Periksa label hash
-    if not DB.startswith(lhash):
-        raise ValueError("Decryption error: Invalid label hash")
-    
-    # Cari batasan pesan
-    i = hlen
-    while i < len(DB):
-        if DB[i] == 0:
-            i += 1
-        elif DB[i] == 1:
-            i += 1
-            break
-        else:
+        # Hash label (sekali per konteks); label str di-encode UTF-8 seperti sha256.update
+        if isinstance(label, str):
+            label = label.encode('utf-8')
+        self.lhash = label_hash(bytes(label), self.hash.name)
+        self.lhash_int = int.from_bytes(self.lhash, byteorder='big')
+        
+        # Kunci CRT (p, q, dP, dQ, qInv): dua modexp setengah ukuran, ~3-4x lebih cepat;
+        # kunci multi-prime menambah satu modexp kecil per prime tambahan
+        self._decrypt_int = getattr(key, 'decrypt_int', None)
+    
+    def eme_encode(self, message, seed=None):
+        """EME-OAEP encoding, menghasilkan encoded message EM sebagai integer.
+        seed hanya diisi untuk test vector; default-nya seed random.
+        Source: https://en.wikipedia.org/wiki/Optimal_asymmetric_encryption_padding#Encoding"""
+        k = self.k
+        hlen = self.hlen
+        mlen = len(message)
+        db_len = k - hlen - 1
+        
+        # Periksa panjang pesan
+        if mlen > self.max_message_length:
+            raise ValueError("Message too long")
+        
+        metrics = instrument.active
+        if metrics is not None:
+            started = perf_counter()
+        
+        # Buat pesan yang dipadding (DB = lHash || PS || 0x01 || M) langsung
+        # sebagai integer: lHash di bagian atas, 0x01 tepat sebelum M
+        DB = (self.lhash_int << (8 * (db_len - hlen))) | (1 << (8 * mlen)) | int.from_bytes(message, byteorder='big')
+        
+        # Generate seed random
+        if seed is None:
+            seed = os.urandom(hlen)
+        
+        # Mask DB dengan dbMask (maskedDB = DB XOR dbMask), XOR per bilangan besar
+        maskedDB = DB ^ int.from_bytes(mgf1(seed, db_len, self.hash), byteorder='big')
+        
+        # Mask seed dengan seedMask (maskedSeed = seed XOR MGF1(maskedDB))
+        seedMask = mgf1(maskedDB.to_bytes(db_len, byteorder='big'), hlen, self.hash)
+        maskedSeed = int.from_bytes(seed, byteorder='big') ^ int.from_bytes(seedMask, byteorder='big')
+        
+        # Encoded message (EM = 0x00 || maskedSeed || maskedDB), byte 0x00 implisit
+        EM = (maskedSeed << (8 * db_len)) | maskedDB
+        if metrics is not None:
+            metrics.add_many(('eme.encodes', 1), ('eme.seconds', perf_counter() - started))
+        return EM
+    
+    def eme_decode(self, EM):
+        """EME-OAEP decoding dari encoded message EM (integer)
+        Source: https://en.wikipedia.org/wiki/Optimal_asymmetric_encryption_padding#Decoding"""
+        k = self.k
+        hlen = self.hlen
+        db_len = k - hlen - 1
+        
+        # Periksa byte pertama (harus 0x00)
+        if EM >> (8 * (k - 1)):
             raise ValueError("Decryption error: Invalid padding")
-    
-    # Ekstrak pesan setelah byte 0x01
-    message = DB[i:]
-    
-    return message
\ No newline at end of file
+        
+        metrics = instrument.active
+        if metrics is not None:
+            started = perf_counter()
+        
+        # Memisahkan komponen
+        maskedSeed = EM >> (8 * db_len)
+        maskedDB = EM & ((1 << (8 * db_len)) - 1)
+        
+        # Recover seed (seed = maskedSeed XOR MGF1(maskedDB))
+        seedMask = mgf1(maskedDB.to_bytes(db_len, byteorder='big'), hlen, self.hash)
+        seed = maskedSeed ^ int.from_bytes(seedMask, byteorder='big')
+        
+        # Recover DB (DB = maskedDB XOR MGF1(seed))
+        dbMask = mgf1(seed.to_bytes(hlen, byteorder='big'), db_len, self.hash)
+        DB = (maskedDB ^ int.from_bytes(dbMask, byteorder='big')).to_bytes(db_len, byteorder='big')
+        if metrics is not None:
+            metrics.add_many(('eme.decodes', 1), ('eme.seconds', perf_counter() - started))
+        
+        # Periksa label hash
+        if not DB.startswith(self.lhash):
+            raise ValueError("Decryption error: Invalid label hash")
+        
+        # Cari separator 0x01, semua byte sebelumnya (PS) harus 0x00
+        i = DB.find(b'\x01', hlen)
+        if i < 0 or DB.count(0, hlen, i) != i - hlen:
+            raise ValueError("Decryption error: Invalid padding")
+        
+        # Ekstrak pesan setelah byte 0x01
+        return DB[i + 1:]
+    
+    def encrypt(self, message):
+        """Fungsi enkripsi RSA-OAEP menggunakan SHA-256"""
+        # Encode lalu lakukan enkripsi RSA
+        EM = self.eme_encode(message)
+        metrics = instrument.active
+        if metrics is None:
+            c_int = pow(EM, self.exponent, self.n)
+        else:
+            started = perf_counter()
+            c_int = pow(EM, self.exponent, self.n)
+            metrics.add_many(('modexp.count', 1), ('modexp.seconds', perf_counter() - started),
+                             ('blocks.encrypted', 1))
+        
+        # Ubah ciphertext ke bytes
+        return c_int.to_bytes(self.k, byteorder='big')
+    
+    def decrypt(self, ciphertext):
+        """RSA-OAEP Decryption using SHA-256"""
+        # Periksa panjang ciphertext
+        if len(ciphertext) != self.k:
+            raise ValueError("Decryption error: Invalid ciphertext length")
+        
+        # Ubah ke int dan lakukan dekripsi RSA
+        c_int = int.from_bytes(ciphertext, byteorder='big')
+        if c_int >= self.n:
+            raise ValueError("Decryption error: Ciphertext representative out of range")
+        metrics = instrument.active
+        if metrics is not None:
+            started = perf_counter()
+        if self._decrypt_int is not None:
+            m_int = self._decrypt_int(c_int)
+        else:
+            m_int = pow(c_int, self.exponent, self.n)
+        if metrics is not None:
+            metrics.add_many(('modexp.count', 1), ('modexp.seconds', perf_counter() - started),
+                             ('blocks.decrypted', 1))
+        
+        return self.eme_decode(m_int)
+    
+    def encrypt_many(self, messages):
+        """Enkripsi banyak pesan dengan kunci yang sama (generator)"""
+        encrypt = self.encrypt
+        for message in messages:
+            yield encrypt(message)
+    
+    def decrypt_many(self, ciphertexts):
+        """Dekripsi banyak ciphertext dengan kunci yang sama (generator)"""
+        decrypt = self.decrypt
+        for ciphertext in ciphertexts:
+            yield decrypt(ciphertext)
+
+def oaep_encrypt(message, key, label=b"", hash_backend=None):
+    """Fungsi enkripsi RSA-OAEP, default SHA-256 (lihat OAEPContext.encrypt)"""
+    return OAEPContext(key, label, hash_backend).encrypt(message)
+
+def oaep_decrypt(ciphertext, key, label=b"", hash_backend=None):
+    """RSA-OAEP Decryption, SHA-256 by default (see OAEPContext.decrypt)"""
+    return OAEPContext(key, label, hash_backend).decrypt(ciphertext)
+
+def oaep_encrypt_many(messages, key, label=b"", hash_backend=None):
+    """Enkripsi banyak pesan dengan satu kunci, setup kunci hanya sekali"""
+    return list(OAEPContext(key, label, hash_backend).encrypt_many(messages))
+
+def oaep_decrypt_many(ciphertexts, key, label=b"", hash_backend=None):
+    """Decrypt many ciphertexts with one key, key setup done only once"""
+    return list(OAEPContext(key, label, hash_backend).decrypt_many(ciphertexts))
@@ -4,13 +4,37 @@ from .rsa import (
     extended_gcd, 
     mod_inverse, 
     generate_keypair, 
+    CRTPrivateKey,
+    OperationCancelled,
     save_key_to_file, 
-    load_key_from_file
+    load_key_from_file,
+    key_fingerprint,
+    load_key_cached,
+    invalidate_key_cache
 )
 
 from .file_ops import (
     encrypt_file, 
     decrypt_file, 
+    decrypt_range,
+    encrypt_stream,
+    decrypt_stream,
+    encrypt_iter,
+    decrypt_iter,
+    encrypt_resumable,
+    decrypt_resumable,
+)
+
+from .key_pool import KeyPool
+
+from .keyring import Keyring
+
+from .aio import (
+    AsyncCipher,
+    aencrypt_file,
+    adecrypt_file,
+    aencrypt_stream,
+    adecrypt_stream,
 )
 
 # Import file operations directly - these will be defined in this file
@@ -22,9 +46,28 @@ __all__ = [
     'extended_gcd', 
     'mod_inverse', 
     'generate_keypair', 
+    'CRTPrivateKey',
+    'OperationCancelled',
     'save_key_to_file', 
     'load_key_from_file',
+    'key_fingerprint',
+    'load_key_cached',
+    'invalidate_key_cache',
     'encrypt_file',
-    'decrypt_file'
+    'decrypt_file',
+    'decrypt_range',
+    'encrypt_stream',
+    'decrypt_stream',
+    'encrypt_iter',
+    'decrypt_iter',
+    'encrypt_resumable',
+    'decrypt_resumable',
+    'KeyPool',
+    'Keyring',
+    'AsyncCipher',
+    'aencrypt_file',
+    'adecrypt_file',
+    'aencrypt_stream',
+    'adecrypt_stream'
 ]
 
@@ -0,0 +1,151 @@
+"""
+asyncio front end for file, stream and single-message encryption.
+
+The CPU-bound RSA work runs on an executor so the event loop stays
+responsive. An AsyncCipher limits how many operations run at once, and
+stream operations move data through a bounded queue, so a slow consumer
+applies backpressure to the encryption thread instead of buffering
+without limit.
+"""
+
+import asyncio
+import threading
+import weakref
+
+from oaep import oaep_encrypt, oaep_decrypt
+from .file_ops import encrypt_file, decrypt_file, encrypt_iter, decrypt_iter, resolve_key
+
+_DONE = object()  # End-of-stream marker on the chunk queue
+
+class _ReaderBridge:
+    """Blocking read() for the worker thread on top of an asyncio StreamReader"""
+
+    def __init__(self, reader, loop):
+        self.reader = reader
+        self.loop = loop
+
+    def read(self, size=-1):
+        return asyncio.run_coroutine_threadsafe(self.reader.read(size), self.loop).result()
+
+class AsyncCipher:
+    """Runs encryption work off the event loop
+
+    executor: executor for whole-file and single-message jobs (None uses the
+        loop's default thread pool; a ProcessPoolExecutor also works)
+    max_concurrency: operations allowed to run at the same time; further
+        calls wait their turn
+    queue_size: encrypted/decrypted chunks buffered per stream operation
+    """
+
+    def __init__(self, executor=None, max_concurrency=8, queue_size=16):
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        # asyncio primitives belong to one loop, so keep one per running loop.
+        # Weak keys let finished loops be collected; a semaphore that had to
+        # wait holds its loop, so also drop the entries of closed loops.
+        loop = asyncio.get_running_loop()
+        for closed in [other for other in self._semaphores if other.is_closed()]:
+            del self._semaphores[closed]
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _run(self, func, *args):
+        async with self._semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def encrypt_file(self, input_file, output_file, key_file, mode='block'):
+        """Async encrypt_file"""
+        return await self._run(encrypt_file, input_file, output_file, key_file, mode)
+
+    async def decrypt_file(self, input_file, output_file, key_file):
+        """Async decrypt_file; returns the (possibly renamed) output file"""
+        return await self._run(decrypt_file, input_file, output_file, key_file)
+
+    async def oaep_encrypt(self, message, key, label=b""):
+        """Async oaep_encrypt for a single message"""
+        return await self._run(oaep_encrypt, message, key, label)
+
+    async def oaep_decrypt(self, ciphertext, key, label=b""):
+        """Async oaep_decrypt for a single ciphertext"""
+        return await self._run(oaep_decrypt, ciphertext, key, label)
+
+    async def _pump(self, reader, writer, make_chunks):
+        """Run make_chunks(bridge) on a thread and write its chunks to writer"""
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(self.queue_size)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for chunk in make_chunks(_ReaderBridge(reader, loop)):
+                    # Blocks the worker thread (not the loop) while the queue is full
+                    asyncio.run_coroutine_threadsafe(chunks.put(chunk), loop).result()
+                    if stop.is_set():
+                        return
+            finally:
+                asyncio.run_coroutine_threadsafe(chunks.put(_DONE), loop)
+
+        async with self._semaphore():
+            # Stream bridging needs a thread, whatever executor is configured
+            producer = loop.run_in_executor(None, produce)
+            try:
+                while True:
+                    chunk = await chunks.get()
+                    if chunk is _DONE:
+                        break
+                    writer.write(chunk)
+                    drain = getattr(writer, 'drain', None)
+                    if drain is not None:
+                        await drain()
+            finally:
+                # Unblock the producer if we stop early (error or cancellation)
+                stop.set()
+                while not chunks.empty():
+                    chunks.get_nowait()
+            await producer
+
+    async def encrypt_stream(self, reader, writer, key, mode='block', extension=''):
+        """Encrypt from an asyncio StreamReader into a writer (StreamWriter or
+        any object with write() and an optional async drain())"""
+        key = resolve_key(key)
+        await self._pump(reader, writer,
+                         lambda source: encrypt_iter(source, key, mode, extension))
+
+    async def decrypt_stream(self, reader, writer, key):
+        """Decrypt from an asyncio StreamReader into a writer"""
+        key = resolve_key(key)
+        await self._pump(reader, writer, lambda source: decrypt_iter(source, key))
+
+_default_cipher = AsyncCipher()
+
+def configure(executor=None, max_concurrency=8, queue_size=16):
+    """Replace the AsyncCipher used by the module-level a* functions"""
+    global _default_cipher
+    _default_cipher = AsyncCipher(executor, max_concurrency, queue_size)
+    return _default_cipher
+
+async def aencrypt_file(input_file, output_file, key_file, mode='block'):
+    return await _default_cipher.encrypt_file(input_file, output_file, key_file, mode)
+
+async def adecrypt_file(input_file, output_file, key_file):
+    return await _default_cipher.decrypt_file(input_file, output_file, key_file)
+
+async def aencrypt_stream(reader, writer, key, mode='block', extension=''):
+    return await _default_cipher.encrypt_stream(reader, writer, key, mode, extension)
+
+async def adecrypt_stream(reader, writer, key):
+    return await _default_cipher.decrypt_stream(reader, writer, key)
+
+async def aoaep_encrypt(message, key, label=b""):
+    return await _default_cipher.oaep_encrypt(message, key, label)
+
+async def aoaep_decrypt(ciphertext, key, label=b""):
+    return await _default_cipher.oaep_decrypt(ciphertext, key, label)
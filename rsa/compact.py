@@ -0,0 +1,95 @@
+"""
+Compact container (version 2): a single header followed by fixed-size
+RSA-OAEP blocks, without the per-block length prefix of the block format.
+
+Layout after the common header (MAGIC + format byte, see file_ops):
+    [version (1)][k (2)][key fingerprint (32)][plaintext length (8)]
+    [ext length (1)][extension (10, space padded)]
+    [ciphertext block 0 (k)] ... [ciphertext block N-1 (k)]
+
+Every block is exactly k bytes, so the block count is the body size / k and
+block i starts at data offset + i * k. Every block but the last holds a full
+plaintext block. The fingerprint (rsa.key_fingerprint) identifies the key
+pair, so a wrong key is rejected before any RSA work. The plaintext length
+is UNKNOWN_LENGTH when a stream of unknown size was encrypted; otherwise
+decryption checks it, which also detects files truncated on a block boundary.
+"""
+
+import struct
+
+from .stream_io import read_full, MappedReader
+
+VERSION = 2
+HEADER_FIELDS = struct.Struct('>BH32sQ')  # version, k, key fingerprint, plaintext length
+UNKNOWN_LENGTH = 2 ** 64 - 1
+BULK_BLOCKS = 64  # Blocks fetched per read() when the input is not memory-mapped
+
+def compact_header(prefix, k, fingerprint, plaintext_length, ext_bytes):
+    """The complete header: common prefix, fields and extension"""
+    ext_length = min(len(ext_bytes), 10)
+    return (prefix + HEADER_FIELDS.pack(VERSION, k, fingerprint, plaintext_length)
+            + bytes([ext_length]) + ext_bytes[:ext_length].ljust(10, b' '))
+
+def read_compact_header(f_in):
+    """Read the header fields after the common prefix.
+
+    Returns (original_extension, k, fingerprint, plaintext_length).
+    """
+    fields = read_full(f_in, HEADER_FIELDS.size)
+    ext_info = read_full(f_in, 11)
+    if len(fields) != HEADER_FIELDS.size or len(ext_info) != 11:
+        raise ValueError("Truncated compact header")
+    version, k, fingerprint, plaintext_length = HEADER_FIELDS.unpack(fields)
+    if version != VERSION:
+        raise ValueError(f"Unsupported compact container version: {version}")
+    original_extension = ext_info[1:1 + ext_info[0]].decode('utf-8')
+    return original_extension, k, fingerprint, plaintext_length
+
+def block_count(body_length, k):
+    """Number of ciphertext blocks in a body of body_length bytes"""
+    if body_length % k:
+        raise ValueError("Truncated compact container: body is not a whole number of blocks")
+    return body_length // k
+
+def iter_fixed_blocks(f_in, k):
+    """Yield the k-byte ciphertext blocks up to the end of f_in
+
+    A MappedReader hands out slices of the map; other readers are read
+    BULK_BLOCKS blocks at a time and sliced.
+    """
+    if isinstance(f_in, MappedReader):
+        block_count(f_in.size - f_in.position, k)
+        yield from f_in.iter_views(k)
+        return
+    while True:
+        data = read_full(f_in, k * BULK_BLOCKS)
+        if not data:
+            break
+        view = memoryview(data)
+        block_count(len(view), k)
+        for start in range(0, len(view), k):
+            yield view[start:start + k]
+
+def check_length(blocks, plaintext_length):
+    """Pass decrypted blocks through, checking their total against the header"""
+    total = 0
+    for block in blocks:
+        total += len(block)
+        yield block
+    if plaintext_length != UNKNOWN_LENGTH and total != plaintext_length:
+        raise ValueError("Decrypted length does not match the header: file truncated or corrupted")
+
+def locate_blocks(block_size, plaintext_length, offset, length):
+    """Find the blocks covering plaintext[offset:offset + length].
+
+    Returns (first block, block count, plaintext offset of the first block),
+    or None for an empty range.
+    """
+    if offset < 0 or length < 0:
+        raise ValueError("Offset and length must be non-negative")
+    end = min(offset + length, plaintext_length)
+    if offset >= end:
+        return None
+    first_block = offset // block_size
+    last_block = (end - 1) // block_size
+    return first_block, last_block - first_block + 1, first_block * block_size
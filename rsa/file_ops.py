@@ -1,83 +1,581 @@
 import os
 import struct
-from oaep import oaep_encrypt, oaep_decrypt
-from .rsa import load_key_from_file
+from oaep import OAEPContext, get_hash, hash_from_id
+from .rsa import load_key_cached, check_cancelled, key_fingerprint
+from .hybrid import iter_hybrid, read_hybrid_header, iter_hybrid_body, TAG_SIZE
+from .parallel import iter_pipeline
+from .seekable import SeekableEncoder, read_seekable_header, read_footer, iter_blocks, locate_range
+from .compact import (compact_header, read_compact_header, iter_fixed_blocks, check_length,
+                      locate_blocks, block_count, UNKNOWN_LENGTH)
+from .stream_io import (read_full, is_seekable, counting_reader, open_input, exact_reader,
+                        write_instrumented, preallocate, MappedReader, OUTPUT_BUFFER_SIZE)
+from .journal import Journal, Checkpoint, open_output, write_checkpointed, CHECKPOINT_BLOCKS
 
-def encrypt_file(input_file, output_file, key_file):
-    """Encrypt a file using RSA-OAEP"""
-    public_key = load_key_from_file(key_file)
+# Versioned header for the newer formats. Legacy files start with the
+# extension length (0-10), so they never begin with this magic.
+# The byte after the magic holds the format in its low 4 bits and the OAEP
+# hash id (oaep.hashes.HASH_IDS, SHA-256 = 0) in its high 4 bits.
+MAGIC = b'RSAO'
+FORMAT_BLOCK = 0  # Block format; written without magic (legacy layout) when the hash is SHA-256
+FORMAT_HYBRID = 1
+FORMAT_SEEKABLE = 2
+FORMAT_COMPACT = 3  # Version 2 container: fixed k-byte blocks, see compact.py
+
+MODES = ('block', 'hybrid', 'seekable', 'compact')
+# Formats made of independent blocks at computable offsets, which can resume
+RESUMABLE_MODES = ('block', 'compact')
+
+def format_prefix(format_id, hash_backend):
+    """MAGIC + the format byte carrying the format id and the hash id"""
+    return MAGIC + bytes([format_id | (hash_backend.hash_id << 4)])
+
+def resolve_key(key):
+    """Accept either a loaded key or the path of a key file"""
+    if isinstance(key, (str, os.PathLike)):
+        return load_key_cached(key)
+    return key
+
+def read_blocks(f_in, block_size):
+    """Yield plaintext blocks of block_size bytes (the last one may be shorter)
+
+    Blocks are memoryview slices of the map when f_in is a MappedReader.
+    """
+    if isinstance(f_in, MappedReader):
+        yield from f_in.iter_views(block_size)
+        return
+    read = exact_reader(f_in)
+    while True:
+        block = read(block_size)
+        if not block:
+            break
+        yield block
+
+RECORD_LENGTH = struct.Struct('>I')
+
+def read_mapped_records(reader):
+    """read_records on a MappedReader: lengths are parsed in place and the
+    blocks are memoryview slices of the map"""
+    view, offset, size = reader.view, reader.position, reader.size
+    first = offset
+    unpack_length = RECORD_LENGTH.unpack_from
+    try:
+        while offset + 4 <= size:
+            (block_length,) = unpack_length(view, offset)
+            start = offset + 4
+            offset = start + block_length
+            if offset > size:
+                raise ValueError("Incomplete encrypted block read")
+            reader.position = offset
+            yield view[start:offset]
+    finally:
+        reader.count_read(reader.position - first)
+
+def read_records(f_in):
+    """Yield the ciphertext blocks of the block format ([4-byte length][block])"""
+    if isinstance(f_in, MappedReader):
+        yield from read_mapped_records(f_in)
+        return
+    read = exact_reader(f_in)
+    while True:
+        # Read the length of the encrypted block
+        length_bytes = read(4)
+        if not length_bytes or len(length_bytes) < 4:
+            break
+        
+        block_length = struct.unpack('>I', length_bytes)[0]
+        encrypted_block = read(block_length)
+        
+        if len(encrypted_block) != block_length:
+            raise ValueError("Incomplete encrypted block read")
+        yield encrypted_block
+
+def remaining_length(reader):
+    """Bytes left in reader, or UNKNOWN_LENGTH if it cannot seek (pipes, sockets)"""
+    if isinstance(reader, MappedReader):
+        return reader.size - reader.position
+    if not is_seekable(reader):
+        return UNKNOWN_LENGTH
+    position = reader.tell()
+    end = reader.seek(0, os.SEEK_END)
+    reader.seek(position)
+    return end - position
+
+def plaintext_block_size(n, hash_backend):
+    """Plaintext bytes per RSA-OAEP block for modulus n"""
+    return (n.bit_length() // 8) - 2 * hash_backend.digest_size - 2
+
+def count_bytes(blocks, counter):
+    """Pass blocks through, adding their total length to counter[0]"""
+    for block in blocks:
+        counter[0] += len(block)
+        yield block
+
+def encrypt_blocks(blocks, public_key, workers=None, hash_backend=None):
+    """Encrypt plaintext blocks in order, on a process pool if workers > 1"""
+    if workers and workers > 1:
+        # memoryview slices of a mapped input cannot be pickled for the pool
+        return iter_pipeline(map(bytes, blocks), public_key, encrypt=True, workers=workers,
+                             hash_backend=get_hash(hash_backend).name)
+    return OAEPContext(public_key, hash_backend=hash_backend).encrypt_many(blocks)
+
+def decrypt_blocks(records, private_key, workers=None, hash_backend=None):
+    """Decrypt ciphertext blocks in order, on a process pool if workers > 1"""
+    if workers and workers > 1:
+        return iter_pipeline(map(bytes, records), private_key, encrypt=False, workers=workers,
+                             hash_backend=get_hash(hash_backend).name)
+    return OAEPContext(private_key, hash_backend=hash_backend).decrypt_many(records)
+
+def extension_header(extension):
+    """Legacy header: [length of extension (1 byte)][extension (10 bytes, space padded)]"""
+    ext_bytes = extension.encode('utf-8')
+    ext_length = min(len(ext_bytes), 10)
+    return bytes([ext_length]) + ext_bytes[:ext_length].ljust(10, b' ')
+
+def block_format_header(mode, public_key, hash_backend, extension, plaintext_length=None):
+    """Everything before the first block of the block or compact format"""
+    if mode == 'compact':
+        k = (public_key[0].bit_length() + 7) // 8
+        return compact_header(format_prefix(FORMAT_COMPACT, hash_backend), k, key_fingerprint(public_key),
+                              plaintext_length, extension.encode('utf-8'))
+    
+    # First the original extension (up to 10 bytes, padded with spaces).
+    # SHA-256 files keep the legacy layout; other hashes need the magic header.
+    if hash_backend.hash_id:
+        return format_prefix(FORMAT_BLOCK, hash_backend) + extension_header(extension)
+    return extension_header(extension)
+
+def frame_blocks(mode, encrypted_blocks):
+    """The encrypted blocks as written to the block or compact format"""
+    if mode == 'compact':
+        # Fixed k-byte blocks, no framing
+        return encrypted_blocks
+    # Block format: the length of each encrypted block followed by the block itself
+    return (struct.pack('>I', len(encrypted_block)) + encrypted_block
+            for encrypted_block in encrypted_blocks)
+
+def write_chunks(chunks, f_out, reader=None, total=None, progress=None, cancel=None):
+    """Write output chunks, reporting progress and checking for cancellation
+
+    reader is the ProgressReader or MappedReader on the input; progress(chunks_written,
+    input_bytes_read, input_total) is called after every chunk, where a
+    chunk is one RSA-OAEP block (block/seekable) or one hybrid chunk.
+    """
+    written = 0
+    for chunk in chunks:
+        check_cancelled(cancel)
+        write_instrumented(f_out, chunk)
+        written += 1
+        if progress is not None:
+            progress(written, reader.bytes_read, total)
+
+def encrypt_iter(reader, key, mode='block', extension='', workers=None, hash_backend=None):
+    """Encrypt a binary stream, yielding the encrypted output in chunks
+
+    reader: any binary file-like object with read()
+    key: public key or public key file path
+    mode: 'block', 'hybrid', 'seekable' or 'compact' (see encrypt_file)
+    extension: original file extension recorded in the header
+    hash_backend: OAEP hash (name from oaep.hashes, default SHA-256),
+        recorded in the header
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown encryption mode: {mode}")
+    
+    public_key = resolve_key(key)
     n, e = public_key
+    reader = counting_reader(reader)
+    hash_backend = get_hash(hash_backend)
     
     # Calculate maximum message size in bytes
-    block_size = (n.bit_length() // 8) - 2 * 32 - 2  # 32 is the SHA-256 digest size in bytes
+    block_size = plaintext_block_size(n, hash_backend)
+    if block_size <= 0:
+        raise ValueError(f"Key too small for OAEP with {hash_backend.name}")
+    
+    if mode == 'hybrid':
+        yield from iter_hybrid(reader, public_key, format_prefix(FORMAT_HYBRID, hash_backend),
+                               extension.encode('utf-8'), hash_backend=hash_backend)
+        return
+    
+    if mode == 'seekable':
+        k = (n.bit_length() + 7) // 8
+        encoder = SeekableEncoder(format_prefix(FORMAT_SEEKABLE, hash_backend),
+                                  extension.encode('utf-8'), block_size, k)
+        yield encoder.header
+        plaintext_length = [0]
+        blocks = count_bytes(read_blocks(reader, block_size), plaintext_length)
+        for encrypted_block in encrypt_blocks(blocks, public_key, workers, hash_backend):
+            yield encoder.block(encrypted_block)
+        yield encoder.footer(plaintext_length[0])
+        return
+    
+    # Block and compact formats: the header, then the encrypted blocks
+    plaintext_length = remaining_length(reader) if mode == 'compact' else None
+    yield block_format_header(mode, public_key, hash_backend, extension, plaintext_length)
+    blocks = encrypt_blocks(read_blocks(reader, block_size), public_key, workers, hash_backend)
+    yield from frame_blocks(mode, blocks)
+
+def encrypt_stream(reader, writer, key, mode='block', extension='', workers=None,
+                   hash_backend=None):
+    """Encrypt from one binary file-like object into another (constant memory)"""
+    write_chunks(encrypt_iter(reader, key, mode, extension, workers, hash_backend), writer)
+
+def check_fingerprint(fingerprint, private_key):
+    """Reject a file whose header names a different key pair"""
+    if fingerprint != key_fingerprint(private_key):
+        raise ValueError("The file was encrypted for a different key (fingerprint mismatch)")
+
+def read_header(reader, private_key):
+    """Read and parse the header of an encrypted stream.
+
+    Returns (format_id, original_extension, state, hash_backend); the state
+    is what iter_body needs to decrypt the rest. Works on non-seekable
+    streams except for the seekable container, whose footer has to be read
+    first.
+    """
+    head = read_full(reader, len(MAGIC))
+    if head == MAGIC:
+        prefix = head + read_full(reader, 1)
+        if len(prefix) != len(MAGIC) + 1:
+            raise ValueError("Truncated encrypted file header")
+        format_id = prefix[-1] & 0x0F
+        hash_backend = hash_from_id(prefix[-1] >> 4)
+        if format_id == FORMAT_HYBRID:
+            original_extension, state = read_hybrid_header(reader, private_key, prefix, hash_backend)
+            return FORMAT_HYBRID, original_extension, state, hash_backend
+        if format_id == FORMAT_SEEKABLE:
+            if not is_seekable(reader):
+                raise ValueError("The seekable container needs a seekable input")
+            original_extension, _, k, data_offset = read_seekable_header(reader)
+            return (FORMAT_SEEKABLE, original_extension, (k, data_offset, read_footer(reader)),
+                    hash_backend)
+        if format_id == FORMAT_COMPACT:
+            original_extension, k, fingerprint, plaintext_length = read_compact_header(reader)
+            check_fingerprint(fingerprint, private_key)
+            return FORMAT_COMPACT, original_extension, (k, plaintext_length), hash_backend
+        if format_id == FORMAT_BLOCK:
+            head = b''
+        else:
+            raise ValueError(f"Unsupported encrypted file format: {prefix[-1:].hex()}")
+    else:
+        # Legacy block format (SHA-256)
+        hash_backend = get_hash()
+    
+    # Block format: read the extension information (the first bytes may already be consumed)
+    ext_info = head + read_full(reader, 11 - len(head))
+    if len(ext_info) != 11:
+        raise ValueError("Truncated encrypted file header")
+    ext_length = ext_info[0]
+    original_extension = ext_info[1:1 + ext_length].decode('utf-8')
+    return FORMAT_BLOCK, original_extension, None, hash_backend
+
+def iter_body(reader, private_key, header, workers=None):
+    """Decrypt the data that follows the header, yielding plaintext chunks"""
+    format_id, _, state, hash_backend = header
+    if format_id == FORMAT_HYBRID:
+        return iter_hybrid_body(reader, state)
+    if format_id == FORMAT_SEEKABLE:
+        k, data_offset, footer = state
+        records = iter_blocks(reader, k, data_offset, footer['block_count'])
+    elif format_id == FORMAT_COMPACT:
+        k, plaintext_length = state
+        blocks = decrypt_blocks(iter_fixed_blocks(reader, k), private_key, workers, hash_backend)
+        return check_length(blocks, plaintext_length)
+    else:
+        records = read_records(reader)
+    return decrypt_blocks(records, private_key, workers, hash_backend)
+
+def plaintext_size(header, private_key, body_length):
+    """Decrypted size of a body of body_length bytes, from the header alone
+
+    Exact for the seekable, hybrid and compact formats; for the block format
+    (and compact files of unknown length) it is an upper bound, as only the
+    last block may be shorter.
+    """
+    format_id, _, state, hash_backend = header
+    if format_id == FORMAT_SEEKABLE:
+        return state[2]['plaintext_length']
+    if format_id == FORMAT_HYBRID:
+        record_size = state[0] + TAG_SIZE
+        return max(0, body_length - -(-body_length // record_size) * TAG_SIZE)
+    n = private_key[0]
+    k = (n.bit_length() + 7) // 8
+    block_size = plaintext_block_size(n, hash_backend)
+    if format_id == FORMAT_COMPACT:
+        k, plaintext_length = state
+        if plaintext_length != UNKNOWN_LENGTH:
+            return plaintext_length
+        return body_length // k * block_size
+    return body_length // (4 + k) * block_size
+
+def read_key_fingerprint(input_file):
+    """Key fingerprint recorded in an encrypted file, or None if its format has none
+
+    Only the compact (version 2) container records the fingerprint; this
+    reads nothing past its header.
+    """
+    with open(input_file, 'rb') as f_in:
+        prefix = read_full(f_in, len(MAGIC) + 1)
+        if len(prefix) != len(MAGIC) + 1 or prefix[:-1] != MAGIC or prefix[-1] & 0x0F != FORMAT_COMPACT:
+            return None
+        return read_compact_header(f_in)[2]
+
+def decrypt_iter(reader, key, workers=None):
+    """Decrypt a binary stream, yielding plaintext chunks (format detected from the header)"""
+    private_key = resolve_key(key)
+    reader = counting_reader(reader)
+    header = read_header(reader, private_key)
+    yield from iter_body(reader, private_key, header, workers)
+
+def decrypt_stream(reader, writer, key, workers=None):
+    """Decrypt from one binary file-like object into another (constant memory)
+
+    Returns the original extension recorded in the header.
+    """
+    private_key = resolve_key(key)
+    reader = counting_reader(reader)
+    header = read_header(reader, private_key)
+    write_chunks(iter_body(reader, private_key, header, workers), writer)
+    return header[1]
+
+def encrypt_file(input_file, output_file, key_file, mode='block', workers=None,
+                 progress=None, cancel=None, hash_backend=None, resume=False,
+                 checkpoint_blocks=CHECKPOINT_BLOCKS):
+    """Encrypt a file using RSA-OAEP
+
+    mode='block' (default) encrypts every block with RSA-OAEP, the original
+    format. mode='hybrid' wraps a random per-file key with one RSA-OAEP call
+    and encrypts the data with an authenticated symmetric stream.
+    mode='seekable' writes RSA-OAEP blocks with a block index in the footer,
+    so decrypt_range can decrypt any byte range on its own.
+    mode='compact' writes the version 2 container: one header with the key
+    fingerprint and the plaintext length, then fixed k-byte blocks without
+    length prefixes (4 bytes per block smaller than 'block', and also
+    usable with decrypt_range).
+    workers > 1 spreads the RSA-OAEP blocks over a process pool; the output
+    is identical in layout to the single-core path.
+    progress and cancel: see write_chunks. A cancelled or failed encryption
+    removes the partial output file.
+    hash_backend selects the OAEP hash ('sha256', 'sha384', 'sha512' or
+    'custom_sha256'); decrypt_file reads it back from the header.
+    resume=True checkpoints the run and keeps the partial output on failure,
+    so calling again continues where it stopped (see encrypt_resumable).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown encryption mode: {mode}")
+    
+    public_key = load_key_cached(key_file)
+    if resume:
+        encrypt_resumable(input_file, output_file, public_key, mode, workers, progress, cancel,
+                          hash_backend, checkpoint_blocks)
+        return
     
     # Get the original file extension
     original_extension = os.path.splitext(input_file)[1].lower()
+    total = os.path.getsize(input_file)
     
-    with open(input_file, 'rb') as f_in, open(output_file, 'wb') as f_out:
-        # First write the original extension (up to 10 bytes, padded with spaces)
-        # Format: [length of extension (1 byte)][extension (up to 10 bytes)]
-        ext_bytes = original_extension.encode('utf-8')
-        ext_length = min(len(ext_bytes), 10)
-        f_out.write(bytes([ext_length]))
-        f_out.write(ext_bytes[:ext_length])
-        # Pad if necessary
-        if ext_length < 10:
-            f_out.write(b' ' * (10 - ext_length))
-        
-        # Now encrypt and write the actual file data
-        while True:
-            block = f_in.read(block_size)
-            if not block:
-                break
-            
-            encrypted_block = oaep_encrypt(block, public_key)
-            
-            # Write the length of the encrypted block followed by the block itself
-            f_out.write(struct.pack('>I', len(encrypted_block)))
-            f_out.write(encrypted_block)
+    try:
+        # Regular files are memory-mapped and sliced into blocks without copies
+        with open_input(input_file) as reader, open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as f_out:
+            chunks = encrypt_iter(reader, public_key, mode, original_extension, workers, hash_backend)
+            write_chunks(chunks, f_out, reader, total, progress, cancel)
+    except BaseException:
+        # Do not leave a partial encrypted file behind (never remove a device or pipe)
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+        raise
 
-def decrypt_file(input_file, output_file, key_file):
-    """Decrypt a file using RSA-OAEP"""
+def restore_extension(output_file, original_extension):
+    """Apply the extension recorded in the header to the output file name"""
+    if original_extension and not output_file.lower().endswith(original_extension.lower()):
+        output_file = os.path.splitext(output_file)[0] + original_extension
+        print(f"Restoring original extension: {original_extension}")
+        print(f"Output file renamed to: {output_file}")
+    return output_file
+
+def decrypt_file(input_file, output_file, key_file, workers=None, progress=None, cancel=None,
+                 resume=False, checkpoint_blocks=CHECKPOINT_BLOCKS):
+    """Decrypt a file using RSA-OAEP (the format is detected from the header)
+
+    workers > 1 decrypts the RSA-OAEP blocks on a process pool.
+    progress and cancel: see write_chunks.
+    resume=True checkpoints the run and keeps the partial output on failure,
+    so calling again continues where it stopped (see decrypt_resumable).
+    """
+    if resume:
+        private_key = load_key_cached(key_file)
+        with open_input(input_file) as f_in:
+            output_file = restore_extension(output_file, read_header(f_in, private_key)[1])
+        decrypt_resumable(input_file, output_file, private_key, workers, progress, cancel,
+                          checkpoint_blocks)
+        return output_file
+    
+    opened = False
     try:
-        private_key = load_key_from_file(key_file)
+        private_key = load_key_cached(key_file)
+        total = os.path.getsize(input_file)
         
-        with open(input_file, 'rb') as f_in:
-            # Read the extension information
-            ext_length = f_in.read(1)[0]
-            ext_bytes = f_in.read(10)
-            original_extension = ext_bytes[:ext_length].decode('utf-8')
-            
+        with open_input(input_file) as f_in:
+            header = read_header(f_in, private_key)
             # Check if we need to apply the original extension to the output file
-            base_output = os.path.splitext(output_file)[0]
-            if original_extension and not output_file.lower().endswith(original_extension.lower()):
-                output_file = base_output + original_extension
-                print(f"Restoring original extension: {original_extension}")
-                print(f"Output file renamed to: {output_file}")
+            output_file = restore_extension(output_file, header[1])
             
-            with open(output_file, 'wb') as f_out:
-                while True:
-                    # Read the length of the encrypted block
-                    length_bytes = f_in.read(4)
-                    if not length_bytes or len(length_bytes) < 4:
-                        break
-                    
-                    block_length = struct.unpack('>I', length_bytes)[0]
-                    encrypted_block = f_in.read(block_length)
-                    
-                    if len(encrypted_block) != block_length:
-                        raise ValueError("Incomplete encrypted block read")
-                    
-                    decrypted_block = oaep_decrypt(encrypted_block, private_key)
-                    f_out.write(decrypted_block)
+            with open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as f_out:
+                opened = True
+                size_hint = plaintext_size(header, private_key, total - f_in.tell())
+                reserved = preallocate(f_out, size_hint)
+                chunks = iter_body(f_in, private_key, header, workers)
+                write_chunks(chunks, f_out, f_in, total, progress, cancel)
+                if reserved:
+                    # Drop the preallocated space that was not needed
+                    f_out.truncate()
         
         return output_file  # Return the possibly modified output filename
                 
-    except Exception as e:
-        # Delete the output file if decryption fails
+    except BaseException as e:
+        # Delete the partial output if decryption fails (never a device or pipe)
         try:
-            if os.path.exists(output_file):
+            if opened and os.path.isfile(output_file):
                 os.remove(output_file)
         except:
             pass
-        raise e
\ No newline at end of file
+        raise e
+
+def input_identity(input_file, operation, key):
+    """Journal identity of a resumable run: the input must not change in between"""
+    stat = os.stat(input_file)
+    return dict(operation=operation, input_size=stat.st_size, input_mtime_ns=stat.st_mtime_ns,
+                fingerprint=key_fingerprint(key).hex())
+
+def start_checkpoint(journal, output_file):
+    """The checkpoint to resume from, or None (and no stale journal) to start over"""
+    checkpoint = journal.load() if os.path.exists(output_file) else None
+    if checkpoint is None:
+        journal.remove()
+    return checkpoint
+
+def encrypt_resumable(input_file, output_file, key, mode='compact', workers=None, progress=None,
+                      cancel=None, hash_backend=None, checkpoint_blocks=CHECKPOINT_BLOCKS):
+    """Encrypt a file, checkpointing so that an interrupted run can resume
+
+    Every checkpoint_blocks blocks the output is fsynced and the block index,
+    input offset and output offset are recorded in a journal next to the
+    output (see journal.py); a failure or cancel also checkpoints the blocks
+    already written. Calling again with the same input, key, mode and hash
+    truncates the output to the last checkpoint and continues from there.
+    The output and journal are kept on failure; the journal is removed once
+    the output is complete. Only mode='block' and 'compact' can resume.
+    key is a public key or a key file path.
+    """
+    if mode not in RESUMABLE_MODES:
+        raise ValueError(f"Mode {mode!r} cannot be resumed, use one of {RESUMABLE_MODES}")
+    public_key = resolve_key(key)
+    hash_backend = get_hash(hash_backend)
+    block_size = plaintext_block_size(public_key[0], hash_backend)
+    if block_size <= 0:
+        raise ValueError("Key too small for OAEP with this hash")
+    
+    identity = input_identity(input_file, 'encrypt', public_key)
+    total = identity['input_size']
+    journal = Journal(output_file, mode=mode, hash=hash_backend.name, **identity)
+    checkpoint = start_checkpoint(journal, output_file)
+    
+    with open_input(input_file) as reader, open_output(output_file, checkpoint) as f_out:
+        if checkpoint is None:
+            header = block_format_header(mode, public_key, hash_backend,
+                                         os.path.splitext(input_file)[1].lower(), total)
+            write_instrumented(f_out, header)
+            checkpoint = Checkpoint(0, 0, len(header))
+        reader.seek(checkpoint.input_offset)
+        blocks = encrypt_blocks(read_blocks(reader, block_size), public_key, workers, hash_backend)
+        write_checkpointed(frame_blocks(mode, blocks), f_out, journal, checkpoint,
+                           lambda index: min(index * block_size, total), total,
+                           progress, cancel, checkpoint_blocks)
+    journal.remove()
+
+def decrypt_resumable(input_file, output_file, key, workers=None, progress=None, cancel=None,
+                      checkpoint_blocks=CHECKPOINT_BLOCKS):
+    """Decrypt a block or compact format file, checkpointing like encrypt_resumable
+
+    The output file name is used as given (decrypt_file restores the
+    original extension first). key is a private key or a key file path.
+    """
+    private_key = resolve_key(key)
+    identity = input_identity(input_file, 'decrypt', private_key)
+    total = identity['input_size']
+    journal = Journal(output_file, **identity)
+    
+    with open_input(input_file) as reader:
+        format_id, _, state, hash_backend = read_header(reader, private_key)
+        if format_id == FORMAT_COMPACT:
+            k = record_size = state[0]
+        elif format_id == FORMAT_BLOCK:
+            k = (private_key[0].bit_length() + 7) // 8
+            record_size = RECORD_LENGTH.size + k
+        else:
+            raise ValueError(f"Only files encrypted with mode {RESUMABLE_MODES} can be decrypted resumably")
+        data_offset = reader.tell()
+        
+        checkpoint = start_checkpoint(journal, output_file)
+        with open_output(output_file, checkpoint) as f_out:
+            if checkpoint is None:
+                checkpoint = Checkpoint(0, data_offset, 0)
+            reader.seek(data_offset + checkpoint.block_index * record_size)
+            if format_id == FORMAT_COMPACT:
+                records = iter_fixed_blocks(reader, k)
+            else:
+                records = read_records(reader)
+            blocks = decrypt_blocks(records, private_key, workers, hash_backend)
+            output_length = write_checkpointed(blocks, f_out, journal, checkpoint,
+                                               lambda index: min(data_offset + index * record_size, total),
+                                               total, progress, cancel, checkpoint_blocks)
+    
+    if format_id == FORMAT_COMPACT and state[1] != UNKNOWN_LENGTH and output_length != state[1]:
+        raise ValueError("Decrypted length does not match the header: the file is truncated or corrupted")
+    journal.remove()
+
+def decrypt_range(input_file, offset, length, key):
+    """Decrypt plaintext[offset:offset + length] from a seekable or compact container
+
+    Only the blocks covering the range are read and decrypted: the seekable
+    container finds them through the block index in its footer, the compact
+    container computes their position from the fixed block size. key is a
+    private key or a key file path.
+    """
+    key = resolve_key(key)
+    
+    with open_input(input_file) as f_in:
+        prefix = f_in.read(len(MAGIC) + 1)
+        format_id = prefix[-1] & 0x0F if len(prefix) == len(MAGIC) + 1 else None
+        if prefix[:-1] != MAGIC or format_id not in (FORMAT_SEEKABLE, FORMAT_COMPACT):
+            raise ValueError("decrypt_range needs a file encrypted with mode='seekable' or 'compact'")
+        hash_backend = hash_from_id(prefix[-1] >> 4)
+        
+        if format_id == FORMAT_SEEKABLE:
+            _, block_size, k, _ = read_seekable_header(f_in)
+            footer = read_footer(f_in)
+            located = locate_range(footer, block_size, k, offset, length)
+            if located is None:
+                return b''
+            first_block, ciphertext_offset, count, block_plaintext = located
+        else:
+            _, k, fingerprint, plaintext_length = read_compact_header(f_in)
+            check_fingerprint(fingerprint, key)
+            data_offset = f_in.tell()
+            if plaintext_length == UNKNOWN_LENGTH:
+                raise ValueError("decrypt_range needs a compact file with a known plaintext length")
+            block_count(f_in.seek(0, os.SEEK_END) - data_offset, k)
+            located = locate_blocks(plaintext_block_size(key[0], hash_backend), plaintext_length,
+                                    offset, length)
+            if located is None:
+                return b''
+            first_block, count, block_plaintext = located
+            ciphertext_offset = data_offset + first_block * k
+        
+        plaintext = bytearray()
+        records = iter_blocks(f_in, k, ciphertext_offset, count)
+        for decrypted_block in OAEPContext(key, hash_backend=hash_backend).decrypt_many(records):
+            plaintext += decrypted_block
+    
+    # Trim the partial blocks at both ends
+    start = offset - block_plaintext
+    return bytes(plaintext[start:start + length])
@@ -0,0 +1,108 @@
+"""
+Checkpoint journal for resumable encryption and decryption.
+
+The journal is a small JSON file next to the output (output file name +
+JOURNAL_SUFFIX). It identifies the run (operation, input size and mtime,
+key fingerprint, mode, hash) and records the last durable checkpoint: the
+number of blocks done, the input offset and the output offset.
+
+A checkpoint first flushes and fsyncs the output, then replaces the journal
+atomically, so the journal never points past data that is on disk. A rerun
+with the same identity truncates the output to the recorded offset and
+continues from that block; anything else starts over.
+"""
+
+import json
+import os
+from collections import namedtuple
+
+from .rsa import check_cancelled
+from .stream_io import write_instrumented, OUTPUT_BUFFER_SIZE
+
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_VERSION = 1
+CHECKPOINT_BLOCKS = 1024  # Blocks between two checkpoints
+
+Checkpoint = namedtuple('Checkpoint', 'block_index input_offset output_offset')
+
+class Journal:
+    """Checkpoints of one resumable run
+
+    identity: JSON-serializable values that must all match for a journal
+    left by an earlier run to be resumed
+    """
+
+    def __init__(self, output_file, **identity):
+        self.path = output_file + JOURNAL_SUFFIX
+        self.identity = identity
+
+    def load(self):
+        """The last checkpoint of an earlier run of the same job, or None"""
+        try:
+            with open(self.path) as f:
+                journal = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if journal.get('version') != JOURNAL_VERSION or journal.get('identity') != self.identity:
+            return None
+        try:
+            return Checkpoint(*(int(journal['checkpoint'][field]) for field in Checkpoint._fields))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def save(self, checkpoint, f_out):
+        """Make everything written to f_out durable, then record checkpoint"""
+        f_out.flush()
+        os.fsync(f_out.fileno())
+        
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'version': JOURNAL_VERSION, 'identity': self.identity,
+                       'checkpoint': checkpoint._asdict()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    def remove(self):
+        for path in (self.path, self.path + '.tmp'):
+            if os.path.exists(path):
+                os.remove(path)
+
+def open_output(output_file, checkpoint):
+    """Open the output for a fresh run (checkpoint None) or truncated to the checkpoint"""
+    if checkpoint is None:
+        return open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE)
+    f_out = open(output_file, 'r+b', buffering=OUTPUT_BUFFER_SIZE)
+    f_out.truncate(checkpoint.output_offset)
+    f_out.seek(checkpoint.output_offset)
+    return f_out
+
+def write_checkpointed(results, f_out, journal, checkpoint, input_offset, total=None,
+                       progress=None, cancel=None, checkpoint_blocks=CHECKPOINT_BLOCKS):
+    """Write output blocks, saving a checkpoint every checkpoint_blocks blocks
+
+    results yields the output of each block after the checkpoint;
+    input_offset(block_index) is the input position where that block starts.
+    If writing stops early (error, cancel, KeyboardInterrupt), the blocks
+    written so far are checkpointed before the exception propagates.
+    Returns the final output offset.
+    """
+    block_index, _, output_offset = checkpoint
+    try:
+        for chunk in results:
+            check_cancelled(cancel)
+            write_instrumented(f_out, chunk)
+            block_index += 1
+            output_offset += len(chunk)
+            if block_index % checkpoint_blocks == 0:
+                journal.save(Checkpoint(block_index, input_offset(block_index), output_offset), f_out)
+            if progress is not None:
+                progress(block_index, input_offset(block_index), total)
+    except BaseException:
+        # Everything counted so far is whole blocks: let a rerun continue from here
+        try:
+            journal.save(Checkpoint(block_index, input_offset(block_index), output_offset), f_out)
+        except OSError:
+            pass
+        raise
+    return output_offset
@@ -0,0 +1,262 @@
+"""
+Pool of pre-generated RSA key pairs with a background refill thread.
+
+Key pairs are kept per bit size, in memory and optionally in a spool
+directory (written with save_key_to_file, so spooled keys survive a
+restart). take() pops a ready pair without waiting on key generation
+whenever stock exists; the refill thread tops the pool back up.
+"""
+
+import os
+import re
+import secrets
+import threading
+import time
+from collections import deque
+
+from .rsa import generate_keypair, save_key_to_file, load_key_from_file
+
+SPOOL_NAME = re.compile(r'(\d+)_([0-9a-f]+)_private\.txt')
+DAMAGED_SUFFIX = '.damaged'  # Spool key files that failed to load are renamed with this suffix
+# Refill thread wait after a failed generation, doubled per consecutive failure
+RETRY_SECONDS = 1.0
+MAX_RETRY_SECONDS = 60.0
+
+class KeyPool:
+    """Pre-generated key pairs per bit size
+
+    targets: {bits: number of ready key pairs to keep}
+    spool_dir: optional directory mirroring the pool on disk
+    workers: passed to generate_keypair for each refill
+    """
+
+    def __init__(self, targets, spool_dir=None, workers=None, start=True):
+        self.targets = dict(targets)
+        self.spool_dir = spool_dir
+        self.workers = workers
+
+        self._stock = {bits: deque() for bits in self.targets}
+        # Refill thread and inline (take() on an empty pool) generations are counted apart
+        self._stats = {bits: {'taken': 0, 'misses': 0, 'refilled': 0, 'refill_seconds': 0.0,
+                              'generated_inline': 0, 'inline_seconds': 0.0, 'refill_errors': 0}
+                       for bits in self.targets}
+        self._condition = threading.Condition()
+        self.last_error = None  # Last exception of the refill thread, see metrics()['refill_errors']
+        self._stopping = False
+        self._thread = None
+
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+            self._load_spool()
+        if start:
+            self.start()
+
+    # Spool files: <bits>_<id>_public.txt and <bits>_<id>_private.txt
+    def _spool_paths(self, bits, key_id):
+        prefix = os.path.join(self.spool_dir, f"{bits}_{key_id}")
+        return prefix + "_public.txt", prefix + "_private.txt"
+
+    def _load_spool(self):
+        for name in sorted(os.listdir(self.spool_dir)):
+            # Other files in the directory are not ours
+            match = SPOOL_NAME.fullmatch(name)
+            if match is None:
+                continue
+            bits, key_id = int(match.group(1)), match.group(2)
+            if bits not in self._stock:
+                continue
+            public_file, private_file = self._spool_paths(bits, key_id)
+            if not os.path.exists(public_file):
+                continue
+            try:
+                pair = (load_key_from_file(public_file), load_key_from_file(private_file))
+            except (OSError, ValueError, UnicodeDecodeError, IndexError, TypeError):
+                # Damaged or unreadable: set the pair aside instead of failing the pool
+                for path in (public_file, private_file):
+                    try:
+                        os.replace(path, path + DAMAGED_SUFFIX)
+                    except OSError:
+                        pass
+                continue
+            self._stock[bits].append((key_id, pair))
+
+    # Spool file I/O runs outside _condition, so take() never waits on the disk
+    def _spool(self, bits, pair):
+        """Write a new pair to the spool directory; returns its key id"""
+        key_id = secrets.token_hex(8)
+        if self.spool_dir:
+            public_file, private_file = self._spool_paths(bits, key_id)
+            try:
+                save_key_to_file(pair[1], private_file)
+                save_key_to_file(pair[0], public_file)
+            except BaseException:
+                # Do not leave half a pair behind for _load_spool
+                self._unspool(bits, key_id)
+                raise
+        return key_id
+
+    def _unspool(self, bits, key_id):
+        if self.spool_dir and key_id is not None:
+            for path in self._spool_paths(bits, key_id):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _generate(self, bits, inline=False):
+        started = time.perf_counter()
+        pair = generate_keypair(bits, workers=self.workers)
+        elapsed = time.perf_counter() - started
+        with self._condition:
+            stats = self._stats[bits]
+            if inline:
+                stats['generated_inline'] += 1
+                stats['inline_seconds'] += elapsed
+            else:
+                stats['refilled'] += 1
+                stats['refill_seconds'] += elapsed
+        return pair
+
+    def take(self, bits, wait=True):
+        """Take a ready (public_key, private_key) pair of the given size.
+
+        Returns immediately while stock exists. When the pool is empty the
+        pair is generated inline (counted as a miss), or a RuntimeError is
+        raised if wait is False.
+        """
+        if bits not in self._stock:
+            raise ValueError(f"Key size {bits} is not managed by this pool")
+
+        with self._condition:
+            stats = self._stats[bits]
+            if self._stock[bits]:
+                key_id, pair = self._stock[bits].popleft()
+                stats['taken'] += 1
+            else:
+                key_id = pair = None
+                stats['misses'] += 1
+            self._condition.notify_all()
+
+        if pair is not None:
+            self._unspool(bits, key_id)
+            return pair
+        if not wait:
+            raise RuntimeError(f"Key pool for {bits}-bit keys is empty")
+        pair = self._generate(bits, inline=True)
+        with self._condition:
+            self._stats[bits]['taken'] += 1
+        return pair
+
+    def _next_size_to_refill(self):
+        for bits, target in self.targets.items():
+            if len(self._stock[bits]) < target:
+                return bits
+        return None
+
+    def _record_error(self, bits, error):
+        with self._condition:
+            self._stats[bits]['refill_errors'] += 1
+            self.last_error = error
+
+    def _refill_loop(self):
+        retry = RETRY_SECONDS
+        while True:
+            with self._condition:
+                bits = self._next_size_to_refill()
+                while bits is None and not self._stopping:
+                    self._condition.wait()
+                    bits = self._next_size_to_refill()
+                if self._stopping:
+                    return
+
+            # Generate outside the lock so take() never waits on key generation
+            try:
+                pair = self._generate(bits)
+            except Exception as e:
+                # Keep the thread alive: record the error and back off before retrying
+                self._record_error(bits, e)
+                with self._condition:
+                    if not self._stopping:
+                        self._condition.wait(retry)
+                retry = min(retry * 2, MAX_RETRY_SECONDS)
+                continue
+            retry = RETRY_SECONDS
+            
+            try:
+                key_id = self._spool(bits, pair)
+            except OSError as e:
+                # Spool disk full or not writable: the pair is still served from memory
+                self._record_error(bits, e)
+                key_id = None
+            with self._condition:
+                self._stock[bits].append((key_id, pair))
+                self._condition.notify_all()
+
+    def start(self):
+        """Start the background refill thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._refill_loop, name="key-pool-refill", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the refill thread (a key generation in progress is finished first)"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wait_until_full(self, timeout=None):
+        """Block until every size is at its target depth; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._next_size_to_refill() is not None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def depth(self, bits):
+        """Number of ready key pairs of the given size"""
+        with self._condition:
+            return len(self._stock[bits])
+
+    def metrics(self):
+        """Pool depth, generation counts and refill generation speed per key size, as a plain dict
+
+        generated = refilled (refill thread) + generated_inline (take() on an
+        empty pool). generation_rate is refill keys per second of refill
+        thread generation time; mean_generation_seconds covers both kinds.
+        refill_errors counts refill thread failures (the last one is kept in
+        last_error); a pair that could not be spooled is kept in memory only.
+        """
+        with self._condition:
+            result = {}
+            for bits, target in self.targets.items():
+                stats = self._stats[bits]
+                generated = stats['refilled'] + stats['generated_inline']
+                seconds = stats['refill_seconds'] + stats['inline_seconds']
+                result[bits] = {
+                    'depth': len(self._stock[bits]),
+                    'target': target,
+                    'taken': stats['taken'],
+                    'misses': stats['misses'],
+                    'generated': generated,
+                    'refilled': stats['refilled'],
+                    'generated_inline': stats['generated_inline'],
+                    'generation_rate': (stats['refilled'] / stats['refill_seconds']
+                                        if stats['refill_seconds'] else 0.0),
+                    'mean_generation_seconds': seconds / generated if generated else 0.0,
+                    'refill_errors': stats['refill_errors'],
+                }
+            return result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
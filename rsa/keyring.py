@@ -0,0 +1,148 @@
+"""
+Keyring: a directory of key files indexed by key fingerprint.
+
+The index maps every key file to its fingerprint (rsa.key_fingerprint) and
+is stored next to the keys in INDEX_FILE, so a new process does not have to
+parse every key again. refresh() only loads files that are new or whose
+mtime/size changed, and drops files that were removed. Files that are not
+keys are remembered as such and skipped until they change.
+
+Files encrypted with the compact container record the fingerprint of the
+public key, so the matching private key is found with a dictionary lookup
+instead of trying every key:
+
+    keyring = Keyring('keys/')
+    decrypt_file('report.pdf.enc', 'report.pdf', keyring.key_for_file('report.pdf.enc'))
+"""
+
+import json
+import os
+
+from .rsa import load_key_from_file, key_fingerprint
+from .file_ops import read_key_fingerprint
+
+INDEX_FILE = '.keyring_index.json'
+INDEX_VERSION = 1
+MAX_KEY_FILE_SIZE = 1024 * 1024  # Larger files are never parsed as keys
+
+def is_private_key(key):
+    """True for private keys: CRT keys, or (n, d) with d far larger than any public exponent"""
+    return hasattr(key, 'p') or key[1].bit_length() > 64
+
+def is_valid_entry(entry):
+    """True for an index entry with every field refresh() and the lookup need"""
+    return (isinstance(entry, dict)
+            and isinstance(entry.get('mtime_ns'), int) and isinstance(entry.get('size'), int)
+            and 'fingerprint' in entry and isinstance(entry['fingerprint'], (str, type(None)))
+            and isinstance(entry.get('private'), bool))
+
+class Keyring:
+    """Key files in one directory, looked up by fingerprint
+
+    auto_refresh: rescan the directory when a lookup misses, so keys added
+    after the keyring was opened are found without an explicit refresh()
+    """
+
+    def __init__(self, directory, auto_refresh=True):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.auto_refresh = auto_refresh
+        self._entries = {}  # file name -> {mtime_ns, size, fingerprint (hex or None), private}
+        self._lookup = {}   # (fingerprint hex, private) -> file name
+        self._load_index()
+        self.refresh()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+            return
+        keys = index.get('keys')
+        if isinstance(keys, dict):
+            # Malformed entries (hand edits, older versions) are dropped, so
+            # refresh() reads those key files again like changed ones
+            self._entries = {name: entry for name, entry in keys.items() if is_valid_entry(entry)}
+
+    def _save_index(self):
+        # Written to a temporary file and renamed, so readers never see a partial index
+        temporary = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'keys': self._entries}, f, indent=1, sort_keys=True)
+            os.replace(temporary, self.index_path)
+        except OSError:
+            # Read-only key directory: the index only saves parsing time, keep it in memory
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+
+    def refresh(self):
+        """Bring the index up to date with the directory; returns the number of files (re)loaded"""
+        entries = {}
+        loaded = 0
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if item.name.startswith(INDEX_FILE) or not item.is_file():
+                    continue
+                st = item.stat()
+                entry = self._entries.get(item.name)
+                if entry is None or entry['mtime_ns'] != st.st_mtime_ns or entry['size'] != st.st_size:
+                    entry = self._index_file(item.path, st)
+                    loaded += 1
+                entries[item.name] = entry
+        
+        changed = loaded or entries.keys() != self._entries.keys()
+        self._entries = entries
+        self._lookup = {(entry['fingerprint'], entry['private']): name
+                        for name, entry in sorted(entries.items()) if entry['fingerprint']}
+        if changed:
+            self._save_index()
+        return loaded
+
+    @staticmethod
+    def _index_file(path, st):
+        try:
+            if st.st_size > MAX_KEY_FILE_SIZE:
+                raise ValueError("Too large for a key file")
+            key = load_key_from_file(path)
+            fingerprint = key_fingerprint(key).hex()
+            private = is_private_key(key)
+        except (ValueError, UnicodeDecodeError, IndexError, TypeError):
+            # Not a key file
+            fingerprint, private = None, False
+        return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                'fingerprint': fingerprint, 'private': private}
+
+    def find(self, fingerprint, private=True):
+        """Path of the private (or public) key file with this fingerprint, or None"""
+        if isinstance(fingerprint, bytes):
+            fingerprint = fingerprint.hex()
+        name = self._lookup.get((fingerprint, private))
+        if name is None and self.auto_refresh and self.refresh():
+            name = self._lookup.get((fingerprint, private))
+        return os.path.join(self.directory, name) if name is not None else None
+
+    def key_for_file(self, input_file):
+        """Path of the private key that decrypts input_file
+
+        Raises ValueError if the file records no fingerprint (formats other
+        than the compact container) or no private key in the keyring matches.
+        """
+        fingerprint = read_key_fingerprint(input_file)
+        if fingerprint is None:
+            raise ValueError(f"{input_file} records no key fingerprint (encrypt with mode='compact')")
+        path = self.find(fingerprint)
+        if path is None:
+            raise ValueError(f"No private key with fingerprint {fingerprint.hex()[:16]}... in {self.directory}")
+        return path
+
+    def fingerprints(self, private=True):
+        """Fingerprints (hex) of the keys in the keyring"""
+        return sorted(fp for fp, is_private in self._lookup if is_private == private)
+
+    def __len__(self):
+        return len(self._lookup)
@@ -0,0 +1,67 @@
+"""
+Multi-core pipeline for the block file format.
+
+Blocks are independent, so a reader groups them into batches, a process
+pool encrypts or decrypts the batches, and the results are written back in
+their original order. At most `window` batches are in flight at any time,
+which bounds memory regardless of the file size.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from oaep import OAEPContext
+
+BATCH_BLOCKS = 64  # Blocks per task sent to a worker
+
+# OAEP context installed in each worker process by _init_worker
+_worker_context = None
+
+def _init_worker(key, hash_backend=None):
+    global _worker_context
+    _worker_context = OAEPContext(key, hash_backend=hash_backend)
+
+def _encrypt_batch(blocks):
+    return list(_worker_context.encrypt_many(blocks))
+
+def _decrypt_batch(blocks):
+    return list(_worker_context.decrypt_many(blocks))
+
+def default_workers():
+    """Number of worker processes used when none is given"""
+    return os.cpu_count() or 1
+
+def batched(blocks, batch_size=BATCH_BLOCKS):
+    """Group an iterable of blocks into lists of at most batch_size"""
+    batch = []
+    for block in blocks:
+        batch.append(block)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_pipeline(blocks, key, encrypt=True, workers=None,
+                  batch_size=BATCH_BLOCKS, window=None, hash_backend=None):
+    """Encrypt or decrypt `blocks` on a process pool, yielding results in order.
+
+    blocks: iterable of plaintext blocks (encrypt) or ciphertext blocks (decrypt)
+    window: maximum number of batches in flight (default: 2 per worker)
+    hash_backend: OAEP hash name from oaep.hashes (a name, so it pickles)
+    """
+    workers = workers or default_workers()
+    window = window or 2 * workers
+    task = _encrypt_batch if encrypt else _decrypt_batch
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(key, hash_backend)) as pool:
+        pending = deque()
+        for batch in batched(blocks, batch_size):
+            pending.append(pool.submit(task, batch))
+            # Ordered output: wait for the oldest batch once the window is full
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
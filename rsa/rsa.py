@@ -1,4 +1,14 @@
+import hashlib
+import math
+import mmap
+import multiprocessing
+import os
+import queue
 import random
+import secrets
+import struct
+import threading
+from collections import OrderedDict
 
 # RSA Key Generation
 def is_prime(n, k=40):
@@ -28,22 +38,81 @@ def is_prime(n, k=40):
             return False
     return True
 
-def generate_prime(bits):
-    """Generate a prime number with specified bit length"""
+def _odd_primes_below(limit):
+    """Odd primes below limit (sieve of Eratosthenes)"""
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b'\x00\x00'
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(3, limit, 2) if sieve[i]]
+
+# Trial-division table used to sieve prime candidates before Miller-Rabin
+SMALL_PRIMES = _odd_primes_below(2048)
+
+def miller_rabin_rounds(bits):
+    """Miller-Rabin rounds for a random candidate of the given size.
+
+    Based on FIPS 186-4 Table C.3 (error probability below 2^-100 for RSA
+    primes); small candidates keep the conservative 40 rounds.
+    """
+    if bits >= 1536:
+        return 4
+    if bits >= 1024:
+        return 5
+    if bits >= 512:
+        return 7
+    return 40
+
+def generate_prime(bits, rounds=None):
+    """Generate a prime number with specified bit length
+
+    Picks a random odd starting point and sieves a window of the following
+    odd candidates against SMALL_PRIMES, so Miller-Rabin only runs on
+    candidates with no small factor.
+    """
+    if bits < 16:
+        # Too small to sieve (the candidate could itself be in SMALL_PRIMES)
+        while True:
+            p = random.getrandbits(bits) | (1 << bits - 1) | 1
+            if is_prime(p):
+                return p
+    
+    if rounds is None:
+        rounds = miller_rabin_rounds(bits)
+    window = max(1024, 4 * bits)  # Odd candidates examined per random start
+    
     while True:
-        # Generate a random odd number with specified bit length
-        p = random.getrandbits(bits)
-        p |= (1 << bits - 1) | 1  # Set the highest and lowest bit
-        if is_prime(p):
-            return p
+        # Random odd start with the two highest bits set, so p * q has the full bit length
+        start = secrets.randbits(bits) | (3 << bits - 2) | 1
+        
+        # sieve[j] == 0 means start + 2*j has a small prime factor
+        sieve = bytearray([1]) * window
+        for small_prime in SMALL_PRIMES:
+            # First j with (start + 2*j) % small_prime == 0, i.e. j = -start / 2 mod small_prime
+            j = (-start * (small_prime + 1) // 2) % small_prime
+            sieve[j::small_prime] = bytes(len(range(j, window, small_prime)))
+        
+        j = sieve.find(1)
+        while j != -1:
+            p = start + 2 * j
+            if p.bit_length() != bits:
+                break
+            if is_prime(p, rounds):
+                return p
+            j = sieve.find(1, j + 1)
 
 def extended_gcd(a, b):
-    """Extended Euclidean Algorithm"""
-    if a == 0:
-        return b, 0, 1
-    else:
-        gcd, x, y = extended_gcd(b % a, a)
-        return gcd, y - (b // a) * x, x
+    """Extended Euclidean Algorithm (iterative, safe for 4096-bit operands)
+
+    Returns (gcd, x, y) with a*x + b*y == gcd.
+    """
+    x0, y0, x1, y1 = 1, 0, 0, 1
+    while b:
+        q, a, b = a // b, b, a % b
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+    return a, x0, y0
 
 def mod_inverse(e, phi):
     """Find modular multiplicative inverse"""
@@ -53,43 +122,342 @@ def mod_inverse(e, phi):
     else:
         return (x % phi + phi) % phi
 
-def generate_keypair(bits=2048):
-    """Generate RSA key pair"""
-    # Generate two prime numbers p and q
-    p = generate_prime(bits // 2)
-    q = generate_prime(bits // 2)
+class CRTPrivateKey(tuple):
+    """RSA private key in Chinese Remainder Theorem form.
+
+    Unpacks and compares like the plain (n, d) tuple so existing callers keep
+    working, but also carries p, q, dP, dQ and qInv so decryption can run two
+    half-size exponentiations instead of one full-size pow(c, d, n).
+
+    Multi-prime keys (RFC 8017, section 3.2) list the primes after p and q in
+    `others`, as plain primes r_i or (r_i, d_i, t_i) triplets, with
+    d_i = d mod (r_i - 1) and t_i the inverse of p * q * ... * r_(i-1) mod r_i.
+    """
+
+    def __new__(cls, n, d, p, q, dP=None, dQ=None, qInv=None, others=()):
+        key = super().__new__(cls, (n, d))
+        key.p = p
+        key.q = q
+        key.dP = d % (p - 1) if dP is None else dP
+        key.dQ = d % (q - 1) if dQ is None else dQ
+        key.qInv = mod_inverse(q, p) if qInv is None else qInv
+        
+        key.others = []
+        product = p * q
+        for info in others:
+            r, d_i, t_i = info if isinstance(info, tuple) else (info, None, None)
+            d_i = d % (r - 1) if d_i is None else d_i
+            t_i = mod_inverse(product % r, r) if t_i is None else t_i
+            key.others.append((r, d_i, t_i))
+            product *= r
+        key.others = tuple(key.others)
+        if product != n:
+            raise ValueError("Invalid CRT key: product of the primes != n")
+        return key
+
+    @property
+    def primes(self):
+        """All prime factors of n: p, q, then the other primes in order"""
+        return (self.p, self.q) + tuple(r for r, _, _ in self.others)
+
+    def __getnewargs__(self):
+        # Needed so copies and pickles (e.g. for worker processes) keep the CRT fields
+        return (self[0], self[1], self.p, self.q, self.dP, self.dQ, self.qInv, self.others)
+
+    def decrypt_int(self, c):
+        """RSA decryption primitive (RSADP) using the CRT (Garner's formula)
+
+        Each additional prime adds one more small exponentiation, folded in
+        as in RFC 8017, section 5.1.2, step 2.b.
+        """
+        m1 = pow(c, self.dP, self.p)
+        m2 = pow(c, self.dQ, self.q)
+        h = (self.qInv * (m1 - m2)) % self.p
+        m = m2 + h * self.q
+        
+        R = self.p * self.q
+        for r, d_i, t_i in self.others:
+            m_i = pow(c, d_i, r)
+            h = ((m_i - m) * t_i) % r
+            m += R * h
+            R *= r
+        return m
+
+class OperationCancelled(Exception):
+    """Raised when a long-running operation is stopped through its cancel event"""
+
+def check_cancelled(cancel):
+    """Raise OperationCancelled if the threading.Event `cancel` is set"""
+    if cancel is not None and cancel.is_set():
+        raise OperationCancelled("Operation cancelled")
+
+def _prime_search_worker(bits, e, results):
+    """Worker process: keep finding primes usable with exponent e"""
+    while True:
+        p = generate_prime(bits)
+        if math.gcd(e, p - 1) == 1:
+            results.put(p)
+
+def generate_primes_parallel(bits, count, e=65537, workers=None, progress=None, cancel=None):
+    """Search for `count` distinct primes on several processes at once.
+
+    The first primes reported by any worker win; all workers are terminated
+    as soon as enough have been collected (or when `cancel` is set).
+    Called from a thread other than the main thread, the workers are
+    started with the 'spawn' method.
+    progress(found, count) is called after every new prime.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Forking from a thread other than the main one (GUI worker, key pool refill)
+    # can copy locks held by other threads, e.g. Tk's, into the children; start
+    # them fresh there instead
+    in_main_thread = threading.current_thread() is threading.main_thread()
+    context = multiprocessing.get_context(None if in_main_thread else 'spawn')
+    results = context.Queue()
+    processes = [
+        context.Process(target=_prime_search_worker, args=(bits, e, results), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
     
-    n = p * q  # Modulus
-    phi = (p - 1) * (q - 1)  # Euler's totient function
+    try:
+        primes = []
+        while len(primes) < count:
+            check_cancelled(cancel)
+            try:
+                p = results.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError("All prime search workers exited unexpectedly")
+                continue
+            if p not in primes:
+                primes.append(p)
+                if progress is not None:
+                    progress(len(primes), count)
+        return primes
+    finally:
+        # Cancel the remaining searches right away
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        results.cancel_join_thread()
+        results.close()
+
+# RFC 8017 allows any number of primes; more than MAX_PRIMES buys little and
+# every prime must stay large enough to resist factoring on its own
+MAX_PRIMES = 4
+MIN_PRIME_BITS = 256
+
+def _search_prime(bits, e, exclude, cancel):
+    """Sequential search for a prime usable with exponent e, not in `exclude`"""
+    while True:
+        check_cancelled(cancel)
+        p = generate_prime(bits)
+        if p not in exclude and math.gcd(e, p - 1) == 1:
+            return p
+
+def generate_keypair(bits=2048, workers=None, progress=None, cancel=None, primes=2):
+    """Generate RSA key pair
+
+    workers > 1 searches for the primes on that many processes in parallel.
+    progress(found, primes) is called as each prime is found; setting the
+    threading.Event `cancel` stops the search with OperationCancelled.
+    primes > 2 builds a multi-prime key (RFC 8017): the private operation then
+    runs `primes` exponentiations of bits / primes bits each.
+    """
+    if not 2 <= primes <= MAX_PRIMES:
+        raise ValueError(f"Number of primes must be between 2 and {MAX_PRIMES}")
+    if primes > 2 and bits // primes < MIN_PRIME_BITS:
+        raise ValueError(f"{bits}-bit key is too small for {primes} primes")
     
     # Choose public exponent e
     e = 65537  # Common value for e
     
+    # Prime sizes add up to bits (the first primes take the remainder)
+    sizes = [bits // primes + (i < bits % primes) for i in range(primes)]
+    
+    # Generate distinct primes with gcd(e, r - 1) == 1 for every prime r
+    if workers and workers > 1:
+        factors = []
+        for size in sorted(set(sizes), reverse=True):
+            offset = len(factors)
+            report = None
+            if progress is not None:
+                report = lambda found, _, offset=offset: progress(offset + found, primes)
+            found = generate_primes_parallel(size, sizes.count(size), e, workers, report, cancel)
+            factors.extend(p for p in found if p not in factors)
+    else:
+        factors = []
+    while len(factors) < primes:
+        factors.append(_search_prime(sizes[len(factors)], e, factors, cancel))
+        if progress is not None:
+            progress(len(factors), primes)
+    
+    # Two primes with their two top bits set always give a full-length modulus;
+    # with more primes the product can come out one bit short, so replace the
+    # smallest prime until it has the requested length
+    while math.prod(factors).bit_length() != bits:
+        smallest = factors.index(min(factors))
+        factors[smallest] = _search_prime(sizes[smallest], e, factors, cancel)
+    
+    # Largest primes first, so p > q as usual and qInv is well defined
+    factors.sort(reverse=True)
+    p, q, *others = factors
+    n = math.prod(factors)  # Modulus
+    phi = math.prod(r - 1 for r in factors)  # Euler's totient function
+    
     # Calculate private exponent d
     d = mod_inverse(e, phi)
     
-    # Public key: (n, e), Private key: (n, d)
-    return (n, e), (n, d)
+    # Public key: (n, e), Private key: (n, d) with the CRT parameters attached
+    return (n, e), CRTPrivateKey(n, d, p, q, others=others)
 
 # Key Serialization
-def save_key_to_file(key, filename):
-    """Save RSA key to file in hexadecimal format"""
+BINARY_KEY_MAGIC = b'RSAK'
+BINARY_KEY_VERSION = 1
+
+def _crt_key(values):
+    """CRTPrivateKey from (n, d, p, q[, dP, dQ, qInv[, r_i, d_i, t_i ...]])"""
+    values = tuple(values)
+    if len(values) == 4:
+        return CRTPrivateKey(*values)
+    others = [values[i:i + 3] for i in range(7, len(values), 3)]
+    return CRTPrivateKey(*values[:7], others=others)
+
+def key_values(key):
+    """Integers stored in a key file: (n, e or d), the 7 CRT values, or the
+    7 CRT values followed by (r_i, d_i, t_i) for each additional prime"""
+    if len(key) == 4 or (len(key) >= 7 and (len(key) - 7) % 3 == 0):
+        # Plain tuple (n, d, p, q) or (n, d, p, q, dP, dQ, qInv, ...)
+        key = _crt_key(key)
+    
+    if hasattr(key, 'p'):
+        # CRT private key: n, d, p, q, dP, dQ, qInv, then the other prime triplets
+        values = (key[0], key[1], key.p, key.q, key.dP, key.dQ, key.qInv)
+        return values + tuple(v for info in key.others for v in info)
     # Regular key (n, e or d)
     n, x = key
-    key_str = f"{n:x}\n{x:x}"
+    return (n, x)
+
+def key_from_values(values):
+    """Rebuild a key from the integers read from a key file"""
+    values = tuple(values)
+    if len(values) == 2:
+        # Regular key (n, e or d)
+        return values
+    elif len(values) >= 7 and (len(values) - 7) % 3 == 0:
+        # CRT private key (n, d, p, q, dP, dQ, qInv) plus multi-prime triplets
+        return _crt_key(values)
+    else:
+        raise ValueError("Invalid key file format")
+
+def save_key_to_file(key, filename, binary=False):
+    """Save RSA key to file in hexadecimal format
+
+    binary=True writes the compact binary format instead:
+    [magic 'RSAK'][version (1)][count (1)] then per value [length (4)][big-endian bytes]
+    """
+    values = key_values(key)
+    
+    if binary:
+        data = bytearray(BINARY_KEY_MAGIC)
+        data += bytes([BINARY_KEY_VERSION, len(values)])
+        for v in values:
+            raw = v.to_bytes((v.bit_length() + 7) // 8, byteorder='big')
+            data += struct.pack('>I', len(raw)) + raw
+        with open(filename, 'wb') as f:
+            f.write(data)
+        return
     
+    # One value per line
+    key_str = "\n".join(f"{v:x}" for v in values)
     with open(filename, 'w') as f:
         f.write(key_str)
 
+def _parse_binary_key(data):
+    """Parse the binary key format from a bytes-like object (e.g. an mmap)"""
+    # Release the view on every path, or closing the mmap raises BufferError
+    with memoryview(data) as view:
+        if bytes(view[:4]) != BINARY_KEY_MAGIC or len(view) < 6:
+            raise ValueError("Invalid key file format")
+        if view[4] != BINARY_KEY_VERSION:
+            raise ValueError(f"Unsupported binary key version: {view[4]}")
+        
+        values = []
+        offset = 6
+        for _ in range(view[5]):
+            if offset + 4 > len(view):
+                raise ValueError("Truncated binary key file")
+            (length,) = struct.unpack_from('>I', view, offset)
+            offset += 4
+            if offset + length > len(view):
+                raise ValueError("Truncated binary key file")
+            values.append(int.from_bytes(view[offset:offset + length], byteorder='big'))
+            offset += length
+    return key_from_values(values)
+
 def load_key_from_file(filename):
-    """Load RSA key from file"""
-    with open(filename, 'r') as f:
-        lines = f.read().strip().split('\n')
+    """Load RSA key from file (hex text or binary format, detected automatically)"""
+    with open(filename, 'rb') as f:
+        if f.read(len(BINARY_KEY_MAGIC)) == BINARY_KEY_MAGIC:
+            # Binary key: map the file instead of reading it into a new buffer
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _parse_binary_key(mm)
+        f.seek(0)
+        lines = f.read().decode('ascii').strip().split('\n')
     
-    if len(lines) == 2:
-        # Regular key (n, e or d)
-        n = int(lines[0], 16)
-        x = int(lines[1], 16)
-        return (n, x)
-    else:
-        raise ValueError("Invalid key file format")
\ No newline at end of file
+    return key_from_values(int(line, 16) for line in lines)
+
+def key_fingerprint(key):
+    """SHA-256 of the modulus n (32 bytes)
+
+    The modulus is shared by the public and the private key, so both keys of
+    a pair have the same fingerprint and it can be checked before any RSA work.
+    """
+    n = key[0]
+    return hashlib.sha256(n.to_bytes((n.bit_length() + 7) // 8, byteorder='big')).digest()
+
+# Key Cache
+KEY_CACHE_SIZE = 64
+
+_key_cache = OrderedDict()
+_key_cache_lock = threading.Lock()
+
+def load_key_cached(filename):
+    """Load a key through the process-wide LRU cache
+
+    Entries are keyed by absolute path, mtime and size, so a rewritten key
+    file is reloaded automatically; invalidate_key_cache() drops entries
+    explicitly.
+    """
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    cache_key = (path, st.st_mtime_ns, st.st_size)
+    
+    with _key_cache_lock:
+        key = _key_cache.get(cache_key)
+        if key is not None:
+            _key_cache.move_to_end(cache_key)
+            return key
+    
+    key = load_key_from_file(path)
+    with _key_cache_lock:
+        # Drop stale entries for the same path before inserting the new one
+        for stale in [k for k in _key_cache if k[0] == path]:
+            del _key_cache[stale]
+        _key_cache[cache_key] = key
+        while len(_key_cache) > KEY_CACHE_SIZE:
+            _key_cache.popitem(last=False)
+    return key
+
+def invalidate_key_cache(filename=None):
+    """Drop the cached key for filename, or the whole cache if filename is None"""
+    with _key_cache_lock:
+        if filename is None:
+            _key_cache.clear()
+            return
+        path = os.path.abspath(filename)
+        for stale in [k for k in _key_cache if k[0] == path]:
+            del _key_cache[stale]
@@ -0,0 +1,125 @@
+"""
+Seekable container: RSA-OAEP blocks with a block index in the footer, so a
+plaintext byte range can be decrypted without touching the rest of the file.
+
+Layout after the common header (MAGIC + format byte, see file_ops):
+    [ext length (1)][extension (10, space padded)][plaintext block size (4)][k (2)]
+    [ciphertext block 0 (k)] ... [ciphertext block N-1 (k)]
+    [index: (plaintext offset (8), ciphertext offset (8)) every INDEX_INTERVAL blocks]
+    [footer: index offset (8)][index entries (8)][block count (8)]
+             [plaintext length (8)][index interval (4)][FOOTER_MAGIC (4)]
+"""
+
+import bisect
+import os
+import struct
+
+from .stream_io import read_full, exact_reader
+
+HEADER_FIELDS = struct.Struct('>IH')  # plaintext block size, k
+INDEX_ENTRY = struct.Struct('>QQ')    # plaintext offset, ciphertext offset
+FOOTER = struct.Struct('>QQQQI4s')
+FOOTER_MAGIC = b'RSAX'
+INDEX_INTERVAL = 256  # Blocks between two index entries
+
+class SeekableEncoder:
+    """Produces the container bytes: header, then k-byte blocks, then the footer index"""
+
+    def __init__(self, prefix, ext_bytes, block_size, k):
+        self.block_size = block_size
+        self.k = k
+        self.index = []
+        self.count = 0
+
+        ext_length = min(len(ext_bytes), 10)
+        self.header = (prefix + bytes([ext_length]) + ext_bytes[:ext_length].ljust(10, b' ')
+                       + HEADER_FIELDS.pack(block_size, k))
+        self.data_offset = len(self.header)
+
+    def block(self, encrypted_block):
+        """Record the next ciphertext block (all blocks are exactly k bytes) and return it"""
+        if len(encrypted_block) != self.k:
+            raise ValueError("Encrypted block has the wrong size")
+        if self.count % INDEX_INTERVAL == 0:
+            self.index.append(INDEX_ENTRY.pack(self.count * self.block_size,
+                                               self.data_offset + self.count * self.k))
+        self.count += 1
+        return encrypted_block
+
+    def footer(self, plaintext_length):
+        """The block index followed by the footer"""
+        return b''.join(self.index) + FOOTER.pack(
+            self.data_offset + self.count * self.k, len(self.index),
+            self.count, plaintext_length, INDEX_INTERVAL, FOOTER_MAGIC)
+
+def read_seekable_header(f_in):
+    """Read the header fields after the common prefix.
+
+    Returns (original_extension, block_size, k, data_offset).
+    """
+    ext_info = read_full(f_in, 11)
+    fields = read_full(f_in, HEADER_FIELDS.size)
+    if len(ext_info) != 11 or len(fields) != HEADER_FIELDS.size:
+        raise ValueError("Truncated seekable header")
+    original_extension = ext_info[1:1 + ext_info[0]].decode('utf-8')
+    block_size, k = HEADER_FIELDS.unpack(fields)
+    return original_extension, block_size, k, f_in.tell()
+
+def read_footer(f_in):
+    """Read the footer and the block index; the file position is restored"""
+    position = f_in.tell()
+    f_in.seek(-FOOTER.size, os.SEEK_END)
+    (index_offset, entries, block_count, plaintext_length,
+     interval, magic) = FOOTER.unpack(f_in.read(FOOTER.size))
+    if magic != FOOTER_MAGIC:
+        raise ValueError("Missing seekable container footer")
+
+    f_in.seek(index_offset)
+    raw = f_in.read(entries * INDEX_ENTRY.size)
+    if len(raw) != entries * INDEX_ENTRY.size:
+        raise ValueError("Truncated seekable block index")
+    index = [INDEX_ENTRY.unpack_from(raw, i * INDEX_ENTRY.size) for i in range(entries)]
+    f_in.seek(position)
+    return {
+        'index_offset': index_offset,
+        'block_count': block_count,
+        'plaintext_length': plaintext_length,
+        'interval': interval,
+        'index': index,
+    }
+
+def iter_blocks(f_in, k, ciphertext_offset, count):
+    """Yield `count` consecutive k-byte ciphertext blocks starting at ciphertext_offset"""
+    f_in.seek(ciphertext_offset)
+    read = exact_reader(f_in)
+    for _ in range(count):
+        encrypted_block = read(k)
+        if len(encrypted_block) != k:
+            raise ValueError("Incomplete encrypted block read")
+        yield encrypted_block
+
+def locate_range(footer, block_size, k, offset, length):
+    """Find the blocks covering plaintext[offset:offset + length].
+
+    Returns (first block, ciphertext offset of that block, block count,
+    plaintext offset of that block), or None for an empty range.
+    """
+    total = footer['plaintext_length']
+    if offset < 0 or length < 0:
+        raise ValueError("Offset and length must be non-negative")
+    end = min(offset + length, total)
+    if offset >= end:
+        return None
+
+    # Nearest index entry at or before the requested offset
+    plaintext_offsets = [entry[0] for entry in footer['index']]
+    slot = bisect.bisect_right(plaintext_offsets, offset) - 1
+    entry_plaintext, entry_ciphertext = footer['index'][slot]
+    entry_block = slot * footer['interval']
+
+    # Every block but the last holds exactly block_size plaintext bytes
+    first_block = entry_block + (offset - entry_plaintext) // block_size
+    last_block = entry_block + (end - 1 - entry_plaintext) // block_size
+    ciphertext_offset = entry_ciphertext + (first_block - entry_block) * k
+    block_plaintext = entry_plaintext + (first_block - entry_block) * block_size
+    return first_block, ciphertext_offset, last_block - first_block + 1, block_plaintext
@@ -0,0 +1,209 @@
+"""
+Small I/O helpers shared by the file formats, so they work on any binary
+file-like object (files, pipes, sockets, stdin) and not only on paths.
+
+Regular files can also go through the zero-copy engine: MappedReader
+memory-maps the input and hands out memoryview slices of the map instead
+of a new bytes object per read() call, and output files get a large write
+buffer (OUTPUT_BUFFER_SIZE) so the per-block chunks reach the file in a few
+large write() calls.
+"""
+
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from time import perf_counter
+
+from oaep import instrument
+
+def read_full(reader, size):
+    """Read exactly `size` bytes, or fewer only at end of stream.
+
+    Raw pipes and sockets may return short reads; this keeps calling
+    read() until the requested amount or EOF is reached.
+    """
+    data = reader.read(size)
+    if data is None:
+        data = b''
+    if len(data) == size or not data:
+        return data
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        more = reader.read(remaining)
+        if not more:
+            break
+        parts.append(more)
+        remaining -= len(more)
+    return b''.join(parts)
+
+def is_seekable(stream):
+    """True if the stream supports seek/tell (regular files, BytesIO)"""
+    try:
+        return stream.seekable()
+    except AttributeError:
+        return False
+
+class ProgressReader:
+    """Wraps a reader and counts the bytes read through it, for progress
+    reporting and the io.read_* metrics when instrumentation is enabled.
+    Everything else (seek, tell, seekable...) is passed through."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        metrics = instrument.active
+        if metrics is None:
+            data = self.reader.read(size)
+        else:
+            started = perf_counter()
+            data = self.reader.read(size)
+            metrics.add_many(('io.read_bytes', len(data or b'')),
+                             ('io.read_seconds', perf_counter() - started))
+        if data:
+            self.bytes_read += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.reader, name)
+
+class MappedReader:
+    """Reads a regular file through a read-only memory map.
+
+    read() behaves like a file and returns bytes (used for headers);
+    read_view() returns a memoryview slice of the map without copying, for
+    the block loops. Counts bytes_read and the io.read_* metrics like
+    ProgressReader (bytes_read is the current position). Raises ValueError or OSError if the file cannot be
+    mapped (empty files, pipes), see open_reader.
+    """
+
+    def __init__(self, f):
+        self.file = f
+        self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        self.size = len(self.map)
+        self.position = 0
+
+    @property
+    def bytes_read(self):
+        return self.position
+
+    def count_read(self, size):
+        """Record size bytes read through the map in the io.read_* metrics"""
+        metrics = instrument.active
+        if metrics is not None:
+            # No syscall to time: the pages are faulted in when the slices are used
+            metrics.add_many(('io.read_bytes', size), ('io.read_seconds', 0.0))
+
+    def advance(self, end):
+        """Move the position to end, counting the bytes in between as read"""
+        self.count_read(end - self.position)
+        self.position = end
+
+    def read_view(self, size=-1):
+        start = self.position
+        end = self.size if size is None or size < 0 else min(self.size, start + size)
+        self.advance(end)
+        return self.view[start:end]
+
+    def iter_views(self, size):
+        """Yield the rest of the map as consecutive memoryview slices of size bytes"""
+        view, map_size, first = self.view, self.size, self.position
+        try:
+            for start in range(first, map_size, size):
+                end = self.position = min(start + size, map_size)
+                yield view[start:end]
+        finally:
+            self.count_read(self.position - first)
+
+    def read(self, size=-1):
+        return self.read_view(size).tobytes()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Negative seek position")
+        self.position = offset
+        return offset
+
+    def tell(self):
+        return self.position
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        self.view.release()
+        try:
+            self.map.close()
+        except BufferError:
+            # A block slice is still referenced somewhere; the map is closed when it is collected
+            pass
+
+def open_reader(f):
+    """MappedReader for a regular, non-empty file; ProgressReader otherwise"""
+    try:
+        return MappedReader(f)
+    except (ValueError, OSError, io.UnsupportedOperation):
+        return ProgressReader(f)
+
+@contextmanager
+def open_input(filename):
+    """Open a file for reading through open_reader; the map (if any) and the
+    file are closed when the with block ends"""
+    with open(filename, 'rb') as f:
+        reader = open_reader(f)
+        try:
+            yield reader
+        finally:
+            reader.close()
+
+def counting_reader(reader):
+    """Wrap reader in a ProgressReader unless it already counts its bytes"""
+    if isinstance(reader, (ProgressReader, MappedReader)):
+        return reader
+    return ProgressReader(reader)
+
+def exact_reader(reader):
+    """read(size) function for the block loops: zero-copy slices from a
+    MappedReader, read_full (bytes) for any other reader"""
+    if isinstance(reader, MappedReader):
+        return reader.read_view
+    return lambda size: read_full(reader, size)
+
+def write_instrumented(writer, data):
+    """writer.write(data), recording io.write_* metrics when enabled"""
+    metrics = instrument.active
+    if metrics is None:
+        writer.write(data)
+    else:
+        started = perf_counter()
+        writer.write(data)
+        metrics.add_many(('io.write_bytes', len(data)),
+                         ('io.write_seconds', perf_counter() - started))
+
+# Write buffer for output files: the per-block chunks are gathered by the C
+# BufferedWriter and reach the file in a few large write() calls
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+def preallocate(f_out, size):
+    """Reserve size bytes for the output file up front, so the file system
+    allocates it once instead of growing it write by write.
+
+    Best effort: returns True only if the space was reserved, in which case
+    the caller truncates the file to what was actually written. Pipes,
+    character devices and file systems without fallocate return False.
+    """
+    if size <= 0 or not hasattr(os, 'posix_fallocate'):
+        return False
+    try:
+        os.posix_fallocate(f_out.fileno(), 0, size)
+    except (OSError, ValueError, io.UnsupportedOperation):
+        return False
+    return True
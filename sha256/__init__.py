@@ -1,3 +1,4 @@
-from .custom_sha256 import new, SHA256, sha256
+from .custom_sha256 import new, SHA256, sha256, compress, precompute_rounds, H0
+from .batch import digest_many
 
-__all__ = ['new', 'SHA256', 'sha256']
\ No newline at end of file
+__all__ = ['new', 'SHA256', 'sha256', 'compress', 'precompute_rounds', 'H0', 'digest_many']
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""SHA-256 multi-lane: hash banyak pesan pendek sekaligus.
+
+Semua pesan dengan jumlah blok (setelah padding) yang sama dikelompokkan,
+lalu fungsi compression dijalankan sekali untuk seluruh kelompok: setiap
+word a..h dan w[i] berisi satu lane per pesan.
+
+Dua backend lane:
+    'numpy'  array uint32 NumPy (opsional; overhead per operasi lebih besar,
+             jadi baru lebih cepat untuk kelompok besar, lihat NUMPY_MIN_LANES)
+    'int'    SWAR di atas bilangan bulat Python: setiap lane menempati slot
+             64-bit dalam satu int besar, nilai 32-bit ada di setengah bawah
+             slot sehingga carry penjumlahan dan bit rotasi yang "bocor"
+             selalu jatuh di setengah atas dan dibuang dengan satu mask.
+             Operasinya tetap berjalan di C untuk semua lane sekaligus.
+"""
+
+from .custom_sha256 import K, H0, pad_message, sha256
+
+try:
+    import numpy
+except ImportError:  # NumPy opsional
+    numpy = None
+
+def _group_by_blocks(messages):
+    """Kelompokkan index pesan berdasarkan jumlah blok 64 byte setelah padding"""
+    groups = {}
+    for index, message in enumerate(messages):
+        blocks = (len(message) + 9 + 63) // 64
+        groups.setdefault(blocks, []).append(index)
+    return groups
+
+def _compress_lanes_int(data, lanes, blocks):
+    """Hash `lanes` pesan yang sudah dipadding (masing-masing blocks * 64 byte,
+    disambung dalam data) dengan SWAR int; mengembalikan digest yang disambung"""
+    stride = blocks * 64
+    ones = int.from_bytes(b'\x00\x00\x00\x00\x00\x00\x00\x01' * lanes, byteorder='big')
+    M = 0xFFFFFFFF * ones  # Mask setengah bawah setiap slot
+    Kl = [k * ones for k in K]
+    state = [h * ones for h in H0]
+
+    buf = bytearray(8 * lanes)
+    for block in range(blocks):
+        # Susun word ke-j dari setiap pesan ke slot lane masing-masing
+        w = []
+        for j in range(16):
+            offset = block * 64 + j * 4
+            for t in range(4):
+                buf[4 + t::8] = data[offset + t::stride]
+            w.append(int.from_bytes(buf, byteorder='big'))
+
+        for i in range(16, 64):
+            x = w[i-15]
+            y = w[i-2]
+            s0 = ((((x >> 7) | (x << 25)) ^ ((x >> 18) | (x << 14))) & M) ^ (x >> 3) & M
+            s1 = ((((y >> 17) | (y << 15)) ^ ((y >> 19) | (y << 13))) & M) ^ (y >> 10) & M
+            w.append((w[i-16] + s0 + w[i-7] + s1) & M)
+
+        a, b, c, d, e, f, g, h = state
+        for i in range(64):
+            S1 = (((e >> 6) | (e << 26)) ^ ((e >> 11) | (e << 21)) ^ ((e >> 25) | (e << 7))) & M
+            ch = (e & f) ^ ((e ^ M) & g)
+            temp1 = h + S1 + ch + Kl[i] + w[i]
+            S0 = (((a >> 2) | (a << 30)) ^ ((a >> 13) | (a << 19)) ^ ((a >> 22) | (a << 10))) & M
+            maj = (a & b) ^ (a & c) ^ (b & c)
+
+            h = g
+            g = f
+            f = e
+            e = (d + temp1) & M
+            d = c
+            c = b
+            b = a
+            a = (temp1 + S0 + maj) & M
+        state = [(s + v) & M for s, v in zip(state, (a, b, c, d, e, f, g, h))]
+
+    # Ambil setengah bawah setiap slot sebagai word digest big-endian
+    out = bytearray(32 * lanes)
+    for word, value in enumerate(state):
+        raw = value.to_bytes(8 * lanes, byteorder='big')
+        for t in range(4):
+            out[word * 4 + t::32] = raw[4 + t::8]
+    return out
+
+def _compress_lanes_numpy(data, lanes, blocks):
+    """Sama seperti _compress_lanes_int, dengan array uint32 NumPy per word"""
+    u32 = numpy.uint32
+    words = numpy.frombuffer(bytes(data), dtype='>u4').reshape(lanes, blocks * 16).astype(u32)
+    Kl = numpy.array(K, dtype=u32)
+    state = [numpy.full(lanes, h, dtype=u32) for h in H0]
+
+    def rotr(x, r):
+        return (x >> u32(r)) | (x << u32(32 - r))
+
+    for block in range(blocks):
+        w = [words[:, block * 16 + j] for j in range(16)]
+        for i in range(16, 64):
+            x = w[i-15]
+            y = w[i-2]
+            s0 = rotr(x, 7) ^ rotr(x, 18) ^ (x >> u32(3))
+            s1 = rotr(y, 17) ^ rotr(y, 19) ^ (y >> u32(10))
+            w.append(w[i-16] + s0 + w[i-7] + s1)
+
+        a, b, c, d, e, f, g, h = state
+        for i in range(64):
+            S1 = rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25)
+            ch = (e & f) ^ (~e & g)
+            temp1 = h + S1 + ch + Kl[i] + w[i]
+            S0 = rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22)
+            maj = (a & b) ^ (a & c) ^ (b & c)
+
+            h = g
+            g = f
+            f = e
+            e = d + temp1
+            d = c
+            c = b
+            b = a
+            a = temp1 + S0 + maj
+        state = [s + v for s, v in zip(state, (a, b, c, d, e, f, g, h))]
+
+    return numpy.stack(state, axis=1).astype('>u4').tobytes()
+
+BACKENDS = {'int': _compress_lanes_int}
+if numpy is not None:
+    BACKENDS['numpy'] = _compress_lanes_numpy
+
+# Di bawah jumlah lane ini backend int lebih cepat dari NumPy
+NUMPY_MIN_LANES = 256
+
+def choose_backend(lanes):
+    """Backend otomatis untuk satu kelompok berisi `lanes` pesan"""
+    if numpy is not None and lanes >= NUMPY_MIN_LANES:
+        return 'numpy'
+    return 'int'
+
+def digest_many(messages, backend=None):
+    """Hash SHA-256 untuk banyak pesan sekaligus, hasil sesuai urutan input.
+
+    Pesan dengan panjang berbeda boleh dicampur: pesan dikelompokkan menurut
+    jumlah blok setelah padding dan setiap kelompok di-hash secara multi-lane.
+    backend: 'numpy' atau 'int' (default: dipilih per kelompok, NumPy untuk
+    kelompok besar jika terpasang)
+    """
+    messages = [m.encode('utf-8') if isinstance(m, str) else bytes(m) for m in messages]
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError(f"Unknown lane backend: {backend}")
+
+    digests = [None] * len(messages)
+    for blocks, indices in _group_by_blocks(messages).items():
+        if len(indices) == 1:
+            # Satu pesan saja: jalur skalar lebih murah
+            digests[indices[0]] = sha256(messages[indices[0]])
+            continue
+        data = b''.join(pad_message(messages[index]) for index in indices)
+        compress_lanes = BACKENDS[backend or choose_backend(len(indices))]
+        out = compress_lanes(data, len(indices), blocks)
+        for lane, index in enumerate(indices):
+            digests[index] = bytes(out[lane * 32:(lane + 1) * 32])
+    return digests
@@ -1,5 +1,10 @@
 # Source: https://medium.com/@domspaulo/python-implementation-of-sha-256-from-scratch-924f660c5d57
 
+import struct
+
+# 16 word 32-bit big-endian dalam satu chunk 64 byte
+_WORDS = struct.Struct('>16I')
+
 def right_rotate(n, b):
     """Rotasi kanan bilangan 32-bit n sebanyak b bit."""
     return ((n >> b) | (n << (32 - b))) & 0xFFFFFFFF
@@ -32,109 +37,178 @@ def pad_message(message):
     
     return message
 
+# Nilai hash awal (32-bit pertama dari bagian pecahan akar kuadrat 8 bilangan prima pertama)
+H0 = (
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+    0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+)
+
+# Konstanta ronde (32-bit pertama dari bagian pecahan akar kubik 64 bilangan prima pertama)
+K = (
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+)
+
+def _rounds(working, w, start, stop):
+    """Jalankan ronde compression ke-start sampai ke-(stop - 1) pada variabel kerja a..h."""
+    a, b, c, d, e, f, g, h = working
+    for i in range(start, stop):
+        S1 = (((e >> 6) | (e << 26)) ^ ((e >> 11) | (e << 21)) ^ ((e >> 25) | (e << 7))) & 0xFFFFFFFF
+        ch = (e & f) ^ ((~e) & g)
+        temp1 = h + S1 + ch + K[i] + w[i]
+        S0 = (((a >> 2) | (a << 30)) ^ ((a >> 13) | (a << 19)) ^ ((a >> 22) | (a << 10))) & 0xFFFFFFFF
+        maj = (a & b) ^ (a & c) ^ (b & c)
+        
+        h = g
+        g = f
+        f = e
+        e = (d + temp1) & 0xFFFFFFFF
+        d = c
+        c = b
+        b = a
+        a = (temp1 + S0 + maj) & 0xFFFFFFFF
+    return a, b, c, d, e, f, g, h
+
+def precompute_rounds(state, prefix):
+    """Jalankan ronde awal yang hanya bergantung pada prefix chunk yang tetap.
+
+    Ronde ke-i hanya memakai word w[i], jadi untuk prefix sepanjang 4*n byte
+    n ronde pertama bisa dihitung sekali dan dipakai ulang oleh compress()
+    untuk setiap chunk yang diawali prefix yang sama (misalnya seed MGF1).
+    """
+    count = len(prefix) // 4
+    w = struct.unpack(f'>{count}I', prefix[:count * 4])
+    return count, _rounds(state, w, 0, count)
+
+def compress(state, chunk, midstate=None):
+    """Fungsi compression SHA-256 untuk satu chunk 512-bit (64 byte).
+
+    Menerima state 8 word dan mengembalikan state baru dalam bentuk tuple.
+    midstate (hasil precompute_rounds) melewati ronde awal yang sudah dihitung.
+    Rotasi ditulis inline karena fungsi ini adalah hot path untuk semua
+    hashing dan MGF1.
+    """
+    # Buat schedule array pesan w[0..63], 16 kata pertama langsung dari chunk
+    w = list(_WORDS.unpack(chunk))
+    
+    # Extend 16 word pertama menjadi 48 word berikutnya w[16..63]
+    for i in range(16, 64):
+        x = w[i-15]
+        y = w[i-2]
+        s0 = ((x >> 7) | (x << 25)) ^ ((x >> 18) | (x << 14)) ^ (x >> 3)
+        s1 = ((y >> 17) | (y << 15)) ^ ((y >> 19) | (y << 13)) ^ (y >> 10)
+        w.append((w[i-16] + s0 + w[i-7] + s1) & 0xFFFFFFFF)
+    
+    # Loop utama fungsi compression, dimulai dari nilai hash saat ini atau midstate
+    if midstate is None:
+        a, b, c, d, e, f, g, h = _rounds(state, w, 0, 64)
+    else:
+        start, working = midstate
+        a, b, c, d, e, f, g, h = _rounds(working, w, start, 64)
+    
+    # Tambahkan hasil chunk yang dikompres ke nilai hash saat ini
+    h0, h1, h2, h3, h4, h5, h6, h7 = state
+    return (
+        (h0 + a) & 0xFFFFFFFF,
+        (h1 + b) & 0xFFFFFFFF,
+        (h2 + c) & 0xFFFFFFFF,
+        (h3 + d) & 0xFFFFFFFF,
+        (h4 + e) & 0xFFFFFFFF,
+        (h5 + f) & 0xFFFFFFFF,
+        (h6 + g) & 0xFFFFFFFF,
+        (h7 + h) & 0xFFFFFFFF,
+    )
+
 def sha256(message):
     """Implementasi fungsi hash SHA-256."""
     
-    # Inisialisasi nilai hash (32-bit pertama dari bagian pecahan akar kuadrat 8 bilangan prima pertama)
-    h0 = 0x6a09e667
-    h1 = 0xbb67ae85
-    h2 = 0x3c6ef372
-    h3 = 0xa54ff53a
-    h4 = 0x510e527f
-    h5 = 0x9b05688c
-    h6 = 0x1f83d9ab
-    h7 = 0x5be0cd19
-    
-    # Inisialisasi konstanta ronde (32-bit pertama dari bagian pecahan akar kubik 64 bilangan prima pertama)
-    k = [
-        0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
-        0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
-        0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
-        0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
-        0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
-        0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
-        0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
-        0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
-    ]
-    
     # Padding pesan agar panjangnya kelipatan 512 bit
     padded_message = pad_message(message)
     
     # Proses pesan dalam chunk 512-bit (64 byte)
+    state = H0
     for chunk_start in range(0, len(padded_message), 64):
-        chunk = padded_message[chunk_start:chunk_start + 64]
-        
-        # Buat schedule array pesan w[0..63] dari word 32-bit
-        w = [0] * 64
-        
-        # Copy 16 kata pertama dari chunk ke schedule array
-        for i in range(16):
-            w[i] = int.from_bytes(chunk[i*4:(i+1)*4], byteorder='big')
-        
-        # Extend 16 word pertama menjadi 48 word berikutnya w[16..63]
-        for i in range(16, 64):
-            s0 = right_rotate(w[i-15], 7) ^ right_rotate(w[i-15], 18) ^ (w[i-15] >> 3)
-            s1 = right_rotate(w[i-2], 17) ^ right_rotate(w[i-2], 19) ^ (w[i-2] >> 10)
-            w[i] = (w[i-16] + s0 + w[i-7] + s1) & 0xFFFFFFFF
-        
-        # Inisialisasi variabel dengan nilai hash saat ini
-        a, b, c, d, e, f, g, h = h0, h1, h2, h3, h4, h5, h6, h7
-        
-        # Loop utama fungsi compression
-        for i in range(64):
-            S1 = right_rotate(e, 6) ^ right_rotate(e, 11) ^ right_rotate(e, 25)
-            ch = (e & f) ^ ((~e) & g)
-            temp1 = (h + S1 + ch + k[i] + w[i]) & 0xFFFFFFFF
-            S0 = right_rotate(a, 2) ^ right_rotate(a, 13) ^ right_rotate(a, 22)
-            maj = (a & b) ^ (a & c) ^ (b & c)
-            temp2 = (S0 + maj) & 0xFFFFFFFF
-            
-            h = g
-            g = f
-            f = e
-            e = (d + temp1) & 0xFFFFFFFF
-            d = c
-            c = b
-            b = a
-            a = (temp1 + temp2) & 0xFFFFFFFF
-        
-        # Tambahkan hasil chunk yang dikompres ke nilai hash saat ini
-        h0 = (h0 + a) & 0xFFFFFFFF
-        h1 = (h1 + b) & 0xFFFFFFFF
-        h2 = (h2 + c) & 0xFFFFFFFF
-        h3 = (h3 + d) & 0xFFFFFFFF
-        h4 = (h4 + e) & 0xFFFFFFFF
-        h5 = (h5 + f) & 0xFFFFFFFF
-        h6 = (h6 + g) & 0xFFFFFFFF
-        h7 = (h7 + h) & 0xFFFFFFFF
+        state = compress(state, padded_message[chunk_start:chunk_start + 64])
     
     # Hasil akhir hash (big-endian)
-    digest = b''
-    for val in [h0, h1, h2, h3, h4, h5, h6, h7]:
-        digest += val.to_bytes(4, byteorder='big')
-    
-    return digest
+    return b''.join(val.to_bytes(4, byteorder='big') for val in state)
 
-# Kelas SHA256
+# Kelas SHA256 (hasher streaming)
 class SHA256:
+    """Hasher SHA-256 streaming.
+
+    Setiap blok penuh 64 byte langsung dikompres saat datang, sehingga yang
+    disimpan hanya state 8 word, sisa blok parsial (< 64 byte), dan panjang
+    total pesan. Memori konstan berapa pun ukuran input.
+    """
+    digest_size = 32
+    block_size = 64
+    name = 'sha256'
+    
     # Konstruktor: Inisialisasi objek dengan pesan awal
     def __init__(self, message=b''):
-        # Konversi menjadi bytes jika input berupa string
-        if isinstance(message, str):
-            message = message.encode('utf-8')
-        self.message = bytearray(message) if message else bytearray()
+        self._state = H0
+        self._buffer = bytearray()
+        self._length = 0
+        if message:
+            self.update(message)
     
-    # Menambahkan data tambahan ke pesan yang sudah ada
+    # Menambahkan data tambahan, blok penuh langsung dikompres
     def update(self, message):
         # Konversi menjadi bytes jika input berupa string
         if isinstance(message, str):
             message = message.encode('utf-8')
-        self.message += message
+        self._length += len(message)
+        
+        buffer = self._buffer
+        state = self._state
+        offset = 0
+        
+        # Lengkapi sisa blok parsial sebelumnya terlebih dahulu
+        if buffer:
+            need = 64 - len(buffer)
+            buffer += message[:need]
+            offset = need
+            if len(buffer) < 64:
+                return self
+            state = compress(state, buffer)
+            buffer.clear()
+        
+        # Kompres blok penuh langsung dari input tanpa menyalin seluruh pesan
+        view = memoryview(message)
+        end = offset + ((len(message) - offset) // 64) * 64
+        for chunk_start in range(offset, end, 64):
+            state = compress(state, view[chunk_start:chunk_start + 64])
+        buffer += view[end:]
+        
+        self._state = state
         return self
     
-    # Menghasilkan hasil hash dalam bentuk bytes
+    # Membuat salinan hasher (state dan sisa blok), berguna untuk prefix yang sama
+    def copy(self):
+        other = SHA256.__new__(SHA256)
+        other._state = self._state
+        other._buffer = bytearray(self._buffer)
+        other._length = self._length
+        return other
+    
+    # Menghasilkan hasil hash dalam bentuk bytes (tidak mengubah state hasher)
     def digest(self):
-        return sha256(self.message)
+        # Padding hanya pada sisa blok parsial: 0x80, nol, lalu panjang pesan 64-bit
+        tail = bytearray(self._buffer) + b'\x80'
+        tail += b'\x00' * ((56 - len(tail)) % 64)
+        tail += (self._length * 8).to_bytes(8, byteorder='big')
+        
+        state = self._state
+        for chunk_start in range(0, len(tail), 64):
+            state = compress(state, tail[chunk_start:chunk_start + 64])
+        return b''.join(val.to_bytes(4, byteorder='big') for val in state)
     
     # Menghasilkan hasil hash dalam bentuk hex
     def hexdigest(self):
@@ -142,4 +216,4 @@ class SHA256:
 
 # Fungsi untuk membuat instance
 def new(message=b''):
-    return SHA256(message)
\ No newline at end of file
+    return SHA256(message)
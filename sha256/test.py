@@ -1,6 +1,12 @@
+import os
+import sys
 import unittest
 import custom_sha256
 
+# batch.py memakai import relatif, jadi diimpor lewat package sha256
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sha256 import batch
+
 test_vector_1 = ""
 test_vector_2 = "abc"
 test_vector_3 = "abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq"
@@ -38,6 +44,35 @@ class TestSHA256(unittest.TestCase):
         self.assertEqual(r_7, sha_7)
         self.assertEqual(r_8, sha_8)
 
+    def test_streaming(self):
+        """tes update bertahap, copy() dan digest() yang tidak merusak state"""
+        hasher = custom_sha256.new()
+        for i in range(0, len(test_vector_8), 7):
+            hasher.update(test_vector_8[i:i + 7])
+        self.assertEqual(hasher.hexdigest(), sha_8)
+        # digest berulang menghasilkan nilai yang sama
+        self.assertEqual(hasher.hexdigest(), sha_8)
+
+        prefix = custom_sha256.new(test_vector_3[:40])
+        clone = prefix.copy()
+        prefix.update(test_vector_3[40:])
+        clone.update(test_vector_3[40:])
+        self.assertEqual(prefix.hexdigest(), sha_3)
+        self.assertEqual(clone.hexdigest(), sha_3)
+        # state hasher hanya menyimpan sisa blok parsial
+        self.assertLess(len(prefix._buffer), 64)
+
+    def test_digest_many(self):
+        """tes digest_many (multi-lane) untuk pesan dengan panjang campuran"""
+        messages = [test_vector_1, test_vector_2, test_vector_3, test_vector_6,
+                    test_vector_7, test_vector_8, test_vector_2, b'']
+        messages += [os.urandom(n) for n in (0, 1, 36, 55, 56, 63, 64, 119, 120, 200)] * 3
+        expected = [custom_sha256.new(m).digest() for m in messages]
+        self.assertEqual(batch.digest_many(messages), expected)
+        for backend in batch.BACKENDS:
+            self.assertEqual(batch.digest_many(messages, backend), expected)
+        self.assertEqual(batch.digest_many([]), [])
+
 if __name__ == '__main__':
     unittest.main()
 
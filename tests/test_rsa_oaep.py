@@ -1,9 +1,28 @@
+import asyncio
+import gc
+import io
+import json
+import math
 import unittest
 import os
 import tempfile
+import threading
 
-from rsa_oaep.rsa import generate_keypair, save_key_to_file, load_key_from_file
-from rsa_oaep.oaep import oaep_encrypt, oaep_decrypt
+from rsa_oaep.rsa import generate_keypair, save_key_to_file, load_key_from_file, encrypt_file, decrypt_file
+from rsa_oaep.rsa import generate_prime, is_prime, extended_gcd, KeyPool
+from rsa_oaep.rsa import load_key_cached, invalidate_key_cache, decrypt_range, OperationCancelled, key_fingerprint
+from rsa_oaep.rsa import encrypt_stream, decrypt_stream, encrypt_iter, decrypt_iter
+from rsa_oaep.rsa import encrypt_resumable, decrypt_resumable
+from rsa_oaep.rsa import Keyring
+from rsa_oaep.rsa import AsyncCipher, aencrypt_file, adecrypt_file, aencrypt_stream, adecrypt_stream
+from rsa_oaep.rsa.file_ops import read_blocks, read_records
+from rsa_oaep.rsa.stream_io import MappedReader, open_input
+from rsa_oaep.cli import main as cli_main
+# The rsa package imports oaep as a top-level package, so use the same module state
+from oaep import instrument
+from rsa_oaep.oaep import oaep_encrypt, oaep_decrypt, oaep_encrypt_many, oaep_decrypt_many, OAEPContext
+from rsa_oaep.oaep import mgf1, get_hash
+from oaep.oaep import label_hash
 
 
 class TestRSAOAEP(unittest.TestCase):
@@ -14,7 +33,8 @@ class TestRSAOAEP(unittest.TestCase):
         # Use a smaller key size for faster tests
         self.key_bits = 1024
         # Generate a key pair for testing
-        self.public_key, self.private_key, self.p, self.q = generate_keypair(self.key_bits)
+        self.public_key, self.private_key = generate_keypair(self.key_bits)
+        self.p, self.q = self.private_key.p, self.private_key.q
         # Create a temporary directory for test files
         self.temp_dir = tempfile.TemporaryDirectory()
     
@@ -37,6 +57,90 @@ class TestRSAOAEP(unittest.TestCase):
         phi_n = (self.p - 1) * (self.q - 1)
         self.assertEqual((e * d) % phi_n, 1)
     
+    def test_prime_generation(self):
+        """Test the sieved prime search and the iterative extended GCD"""
+        for bits in (16, 64, 256, 512):
+            p = generate_prime(bits)
+            self.assertEqual(p.bit_length(), bits)
+            self.assertTrue(is_prime(p))
+        
+        # Modulus has the full requested bit length
+        self.assertEqual(self.public_key[0].bit_length(), self.key_bits)
+        
+        gcd, x, y = extended_gcd(self.p, self.q)
+        self.assertEqual(gcd, 1)
+        self.assertEqual(self.p * x + self.q * y, 1)
+    
+    def test_parallel_key_generation(self):
+        """Test multi-process key generation"""
+        public_key, private_key = generate_keypair(1024, workers=2)
+        n, e = public_key
+        self.assertEqual(n.bit_length(), 1024)
+        self.assertNotEqual(private_key.p, private_key.q)
+        self.assertEqual(n, private_key.p * private_key.q)
+        
+        ciphertext = oaep_encrypt(b"parallel", public_key)
+        self.assertEqual(oaep_decrypt(ciphertext, private_key), b"parallel")
+        
+        # From a worker thread (as in the GUI) the search processes are spawned, not forked
+        keys = []
+        thread = threading.Thread(target=lambda: keys.append(generate_keypair(1024, workers=2)))
+        thread.start()
+        thread.join(120)
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(keys[0][0][0], keys[0][1].p * keys[0][1].q)
+    
+    def test_key_pool(self):
+        """Test the key pool refill, spool directory and metrics"""
+        spool_dir = os.path.join(self.temp_dir.name, "spool")
+        with KeyPool({1024: 2}, spool_dir=spool_dir) as pool:
+            self.assertTrue(pool.wait_until_full(timeout=60))
+            self.assertEqual(len(os.listdir(spool_dir)), 4)
+            
+            public_key, private_key = pool.take(1024, wait=False)
+            ciphertext = oaep_encrypt(b"pool", public_key)
+            self.assertEqual(oaep_decrypt(ciphertext, private_key), b"pool")
+            
+            metrics = pool.metrics()[1024]
+            self.assertEqual(metrics['taken'], 1)
+            self.assertEqual(metrics['misses'], 0)
+            self.assertGreaterEqual(metrics['refilled'], 2)
+            self.assertEqual(metrics['generated_inline'], 0)
+            self.assertGreater(metrics['generation_rate'], 0)
+            self.assertTrue(pool.wait_until_full(timeout=60))
+        
+        # Inline generations on an empty pool are not counted as refills
+        empty = KeyPool({1024: 1}, start=False)
+        empty.take(1024)
+        metrics = empty.metrics()[1024]
+        self.assertEqual((metrics['misses'], metrics['generated_inline'], metrics['refilled']), (1, 1, 0))
+        self.assertEqual(metrics['generation_rate'], 0)
+        
+        # A spool write failure is recorded and does not stop the refill thread
+        blocker = os.path.join(self.temp_dir.name, "not_a_directory")
+        open(blocker, 'w').close()
+        with KeyPool({1024: 2}, start=False) as failing:
+            failing.spool_dir = os.path.join(blocker, "spool")
+            failing.start()
+            self.assertTrue(failing.wait_until_full(timeout=60))
+            metrics = failing.metrics()[1024]
+            self.assertEqual(metrics['refill_errors'], 2)
+            self.assertIsInstance(failing.last_error, OSError)
+            failing.take(1024, wait=False)
+            self.assertTrue(failing.wait_until_full(timeout=60))
+            self.assertEqual(failing.metrics()[1024]['misses'], 0)
+        
+        # A new pool picks up the spooled keys without generating any; stray
+        # files are ignored and damaged pairs are set aside
+        for name, content in (("notes_private.txt", "notes"), ("1024_0bad_public.txt", "0"),
+                              ("1024_0bad_private.txt", "not a key")):
+            with open(os.path.join(spool_dir, name), 'w') as f:
+                f.write(content)
+        restored = KeyPool({1024: 2}, spool_dir=spool_dir, start=False)
+        self.assertEqual(restored.depth(1024), 2)
+        self.assertEqual(restored.metrics()[1024]['generated'], 0)
+        self.assertTrue(os.path.exists(os.path.join(spool_dir, "1024_0bad_private.txt.damaged")))
+    
     def test_key_serialization(self):
         """Test key serialization and deserialization"""
         # Save keys to files
@@ -91,6 +195,684 @@ class TestRSAOAEP(unittest.TestCase):
         wrong_label = b"Wrong label"
         with self.assertRaises(ValueError):
             oaep_decrypt(ciphertext, self.private_key, wrong_label)
+        
+        # str labels are hashed as their UTF-8 encoding
+        ciphertext = oaep_encrypt(message, self.public_key, "label ü")
+        self.assertEqual(oaep_decrypt(ciphertext, self.private_key, "label ü".encode('utf-8')), message)
+    
+    def test_oaep_context_batch(self):
+        """Test the reusable key context and the batch helpers"""
+        messages = [os.urandom(i) for i in range(0, 60, 7)]
+        label = b"batch label"
+        
+        encrypt_context = OAEPContext(self.public_key, label)
+        decrypt_context = OAEPContext(self.private_key, label)
+        ciphertexts = list(encrypt_context.encrypt_many(messages))
+        self.assertEqual(list(decrypt_context.decrypt_many(ciphertexts)), messages)
+        
+        # The functional wrappers interoperate with the context
+        ciphertexts = oaep_encrypt_many(messages, self.public_key, label)
+        self.assertEqual(oaep_decrypt_many(ciphertexts, self.private_key, label), messages)
+        self.assertEqual(decrypt_context.decrypt(oaep_encrypt(b"x", self.public_key, label)), b"x")
+    
+    def test_eme_codec(self):
+        """Test EME-OAEP encode/decode at the boundary message lengths"""
+        context = OAEPContext(self.public_key)
+        seed = bytes(range(32))
+        for length in (0, 1, context.max_message_length - 1, context.max_message_length):
+            message = os.urandom(length)
+            em = context.eme_encode(message, seed)
+            self.assertEqual(em, context.eme_encode(message, seed))
+            self.assertLess(em.bit_length(), 8 * (context.k - 1) + 1)
+            self.assertEqual(context.eme_decode(em), message)
+        
+        with self.assertRaises(ValueError):
+            context.eme_encode(b"x" * (context.max_message_length + 1))
+        
+        # Flipping a bit in the encoded message must be rejected
+        em = context.eme_encode(b"message", seed)
+        with self.assertRaises(ValueError):
+            context.eme_decode(em ^ (1 << 8))
+    
+    def test_crt_private_key(self):
+        """Test CRT decryption against the plain (n, d) key"""
+        n, d = self.private_key
+        plain_key = (n, d)
+        
+        # CRT key should still compare equal to the plain tuple
+        self.assertEqual(self.private_key, plain_key)
+        self.assertEqual(self.private_key.dP, d % (self.p - 1))
+        self.assertEqual(self.private_key.dQ, d % (self.q - 1))
+        self.assertEqual((self.private_key.qInv * self.q) % self.p, 1)
+        
+        message = b"CRT decryption"
+        ciphertext = oaep_encrypt(message, self.public_key)
+        self.assertEqual(oaep_decrypt(ciphertext, self.private_key), message)
+        self.assertEqual(oaep_decrypt(ciphertext, plain_key), message)
+    
+    def test_crt_key_serialization(self):
+        """Test CRT key files and legacy two-line (n, d) key files"""
+        crt_key_file = os.path.join(self.temp_dir.name, "crt_key.txt")
+        legacy_key_file = os.path.join(self.temp_dir.name, "legacy_key.txt")
+        
+        save_key_to_file(self.private_key, crt_key_file)
+        with open(crt_key_file) as f:
+            self.assertEqual(len(f.read().split('\n')), 7)
+        loaded_crt_key = load_key_from_file(crt_key_file)
+        self.assertEqual(loaded_crt_key, self.private_key)
+        self.assertEqual(loaded_crt_key.p, self.p)
+        self.assertEqual(loaded_crt_key.qInv, self.private_key.qInv)
+        
+        save_key_to_file(tuple(self.private_key), legacy_key_file)
+        loaded_legacy_key = load_key_from_file(legacy_key_file)
+        self.assertFalse(hasattr(loaded_legacy_key, 'p'))
+        
+        ciphertext = oaep_encrypt(b"legacy", self.public_key)
+        self.assertEqual(oaep_decrypt(ciphertext, loaded_crt_key), b"legacy")
+        self.assertEqual(oaep_decrypt(ciphertext, loaded_legacy_key), b"legacy")
+
+    def test_multi_prime_keys(self):
+        """Test 3- and 4-prime keys: generation, CRT decryption and key files"""
+        for primes in (3, 4):
+            public_key, private_key = generate_keypair(1024, primes=primes)
+            n, d = private_key
+            self.assertEqual(n.bit_length(), 1024)
+            self.assertEqual(len(private_key.primes), primes)
+            self.assertEqual(math.prod(private_key.primes), n)
+            for r, d_i, t_i in private_key.others:
+                self.assertEqual(d_i, d % (r - 1))
+            
+            message = f"{primes}-prime key".encode()
+            ciphertext = oaep_encrypt(message, public_key)
+            self.assertEqual(oaep_decrypt(ciphertext, private_key), message)
+            self.assertEqual(oaep_decrypt(ciphertext, (n, d)), message)
+            
+            for binary in (False, True):
+                key_file = os.path.join(self.temp_dir.name, f"multi_{primes}_{binary}.key")
+                save_key_to_file(private_key, key_file, binary=binary)
+                loaded_key = load_key_from_file(key_file)
+                self.assertEqual(loaded_key.others, private_key.others)
+                self.assertEqual(oaep_decrypt(ciphertext, loaded_key), message)
+        
+        with self.assertRaises(ValueError):
+            generate_keypair(1024, primes=5)
+
+    
+    def _write_key_files(self):
+        """Save the test key pair and return (public key file, private key file)"""
+        pub_key_file = os.path.join(self.temp_dir.name, "pub_key.txt")
+        priv_key_file = os.path.join(self.temp_dir.name, "priv_key.txt")
+        save_key_to_file(self.public_key, pub_key_file)
+        save_key_to_file(self.private_key, priv_key_file)
+        return pub_key_file, priv_key_file
+    
+    def test_binary_key_format(self):
+        """Test the compact binary key format"""
+        pub_key_file = os.path.join(self.temp_dir.name, "pub_key.bin")
+        priv_key_file = os.path.join(self.temp_dir.name, "priv_key.bin")
+        save_key_to_file(self.public_key, pub_key_file, binary=True)
+        save_key_to_file(self.private_key, priv_key_file, binary=True)
+        
+        self.assertEqual(load_key_from_file(pub_key_file), self.public_key)
+        loaded_priv_key = load_key_from_file(priv_key_file)
+        self.assertEqual(loaded_priv_key, self.private_key)
+        self.assertEqual(loaded_priv_key.qInv, self.private_key.qInv)
+        
+        text_key_file = os.path.join(self.temp_dir.name, "priv_key.txt")
+        save_key_to_file(self.private_key, text_key_file)
+        self.assertLess(os.path.getsize(priv_key_file), os.path.getsize(text_key_file))
+        
+        # Truncated or corrupt binary keys are rejected with ValueError
+        with open(priv_key_file, 'rb') as f:
+            data = f.read()
+        damaged_file = os.path.join(self.temp_dir.name, "damaged.bin")
+        for damaged in (data[:len(data) // 2], data[:5] + b'\x05' + data[6:]):
+            with open(damaged_file, 'wb') as f:
+                f.write(damaged)
+            with self.assertRaises(ValueError):
+                load_key_from_file(damaged_file)
+    
+    def test_key_cache(self):
+        """Test the mtime-aware key cache and explicit invalidation"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        
+        first = load_key_cached(priv_key_file)
+        self.assertIs(load_key_cached(priv_key_file), first)
+        
+        # Rewriting the file with a new mtime reloads it
+        other_public_key, _ = generate_keypair(self.key_bits)
+        save_key_to_file(other_public_key, priv_key_file)
+        stat = os.stat(priv_key_file)
+        os.utime(priv_key_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(load_key_cached(priv_key_file), other_public_key)
+        
+        cached = load_key_cached(pub_key_file)
+        invalidate_key_cache(pub_key_file)
+        self.assertIsNot(load_key_cached(pub_key_file), cached)
+        invalidate_key_cache()
+    
+    def test_file_encryption_modes(self):
+        """Test encrypt_file/decrypt_file round trips for all file formats"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(20 * 1024 + 17)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        
+        for mode in ('block', 'hybrid', 'seekable', 'compact'):
+            encrypted_file = os.path.join(self.temp_dir.name, f"data_{mode}.enc")
+            decrypted_file = os.path.join(self.temp_dir.name, f"data_{mode}.bin")
+            encrypt_file(input_file, encrypted_file, pub_key_file, mode=mode)
+            output = decrypt_file(encrypted_file, decrypted_file, priv_key_file)
+            with open(output, 'rb') as f:
+                self.assertEqual(f.read(), data)
+    
+    def test_mapped_io(self):
+        """Test that the memory-mapped reader yields the same blocks as a plain stream"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(10 * 1024 + 3)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        encrypted_file = os.path.join(self.temp_dir.name, "data.enc")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        encrypt_file(input_file, encrypted_file, pub_key_file)
+        
+        for path, read in ((input_file, lambda f: read_blocks(f, 62)), (encrypted_file, read_records)):
+            with open(path, 'rb') as f:
+                f.seek(11 if path == encrypted_file else 0)
+                expected = [bytes(block) for block in read(f)]
+            with open_input(path) as reader:
+                self.assertIsInstance(reader, MappedReader)
+                reader.seek(11 if path == encrypted_file else 0)
+                blocks = list(read(reader))
+                self.assertIsInstance(blocks[0], memoryview)
+                self.assertEqual([bytes(block) for block in blocks], expected)
+                self.assertEqual(reader.bytes_read, os.path.getsize(path))
+                del blocks
+        
+        # Empty files cannot be mapped and fall back to plain reads; the
+        # preallocated decryption output is truncated to the real size
+        empty_file = os.path.join(self.temp_dir.name, "empty.bin")
+        open(empty_file, 'wb').close()
+        for source in (empty_file, input_file):
+            encrypt_file(source, encrypted_file, pub_key_file)
+            output = decrypt_file(encrypted_file, os.path.join(self.temp_dir.name, "out.bin"),
+                                  priv_key_file)
+            self.assertEqual(os.path.getsize(output), os.path.getsize(source))
+        
+        # Non-regular outputs are written without preallocation and never removed
+        plain_file = os.path.join(self.temp_dir.name, "plain")
+        with open(plain_file, 'wb') as f:
+            f.write(os.urandom(3000))
+        for mode in ('block', 'compact'):
+            encrypt_file(plain_file, encrypted_file, pub_key_file, mode)
+            self.assertEqual(decrypt_file(encrypted_file, os.devnull, priv_key_file), os.devnull)
+        with open(encrypted_file, 'r+b') as f:
+            f.truncate(os.path.getsize(encrypted_file) - 5)
+        with self.assertRaises(ValueError):
+            decrypt_file(encrypted_file, os.devnull, priv_key_file)
+        self.assertTrue(os.path.exists(os.devnull))
+    
+    def test_stream_encryption(self):
+        """Test stream and generator APIs over file-like objects and a pipe"""
+        data = os.urandom(5000)
+        
+        for mode in ('block', 'hybrid', 'seekable', 'compact'):
+            encrypted = io.BytesIO()
+            encrypt_stream(io.BytesIO(data), encrypted, self.public_key, mode=mode, extension='.bin')
+            encrypted.seek(0)
+            decrypted = io.BytesIO()
+            self.assertEqual(decrypt_stream(encrypted, decrypted, self.private_key), '.bin')
+            self.assertEqual(decrypted.getvalue(), data)
+            
+            chunks = b''.join(encrypt_iter(io.BytesIO(data), self.public_key, mode=mode))
+            self.assertEqual(b''.join(decrypt_iter(io.BytesIO(chunks), self.private_key)), data)
+        
+        # Unbuffered pipe: reads may come back short
+        read_fd, write_fd = os.pipe()
+        encrypted = b''.join(encrypt_iter(io.BytesIO(data), self.public_key, mode='hybrid'))
+        
+        def feed():
+            with os.fdopen(write_fd, 'wb', buffering=0) as pipe_in:
+                for i in range(0, len(encrypted), 1000):
+                    pipe_in.write(encrypted[i:i + 1000])
+        
+        feeder = threading.Thread(target=feed)
+        feeder.start()
+        with os.fdopen(read_fd, 'rb', buffering=0) as pipe_out:
+            decrypted = io.BytesIO()
+            decrypt_stream(pipe_out, decrypted, self.private_key)
+        feeder.join()
+        self.assertEqual(decrypted.getvalue(), data)
+    
+    def test_async_api(self):
+        """Test the asyncio front end for files, streams and single messages"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(3000)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        
+        class Sink:
+            def __init__(self):
+                self.data = bytearray()
+            def write(self, chunk):
+                self.data += chunk
+            async def drain(self):
+                await asyncio.sleep(0)
+        
+        def stream_reader(payload):
+            reader = asyncio.StreamReader()
+            reader.feed_data(payload)
+            reader.feed_eof()
+            return reader
+        
+        async def run():
+            encrypted_file = os.path.join(self.temp_dir.name, "data.enc")
+            await aencrypt_file(input_file, encrypted_file, pub_key_file, mode='hybrid')
+            output = await adecrypt_file(encrypted_file, os.path.join(self.temp_dir.name, "out.bin"), priv_key_file)
+            with open(output, 'rb') as f:
+                self.assertEqual(f.read(), data)
+            
+            encrypted = Sink()
+            await aencrypt_stream(stream_reader(data), encrypted, self.public_key)
+            decrypted = Sink()
+            await adecrypt_stream(stream_reader(bytes(encrypted.data)), decrypted, self.private_key)
+            self.assertEqual(bytes(decrypted.data), data)
+            
+            cipher = AsyncCipher(max_concurrency=2)
+            messages = [os.urandom(20) for _ in range(5)]
+            ciphertexts = await asyncio.gather(*(cipher.oaep_encrypt(m, self.public_key) for m in messages))
+            plaintexts = await asyncio.gather(*(cipher.oaep_decrypt(c, self.private_key) for c in ciphertexts))
+            self.assertEqual(list(plaintexts), messages)
+        
+        asyncio.run(run())
+        
+        # A cipher reused by several asyncio.run() calls does not keep their loops alive
+        cipher = AsyncCipher(max_concurrency=1)
+        async def contended():
+            await asyncio.gather(*(cipher.oaep_encrypt(b"x", self.public_key) for _ in range(3)))
+        for _ in range(3):
+            asyncio.run(contended())
+        gc.collect()
+        self.assertLessEqual(len(cipher._semaphores), 1)
+    
+    def test_decrypt_range(self):
+        """Test range decryption from the seekable and compact containers"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(20 * 1024 + 3)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        
+        encrypted_file = os.path.join(self.temp_dir.name, "data.enc")
+        for mode in ('seekable', 'compact'):
+            encrypt_file(input_file, encrypted_file, pub_key_file, mode=mode)
+            for offset, length in ((0, 10), (61, 3), (100, 1000), (16000, 200), (len(data) - 5, 100), (len(data), 10), (5, 0)):
+                self.assertEqual(decrypt_range(encrypted_file, offset, length, priv_key_file),
+                                 data[offset:offset + length])
+        
+        # Range decryption needs the seekable or compact container
+        block_file = os.path.join(self.temp_dir.name, "data_block.enc")
+        encrypt_file(input_file, block_file, pub_key_file)
+        with self.assertRaises(ValueError):
+            decrypt_range(block_file, 0, 10, priv_key_file)
+    
+    def test_compact_container(self):
+        """Test the version 2 container: fixed-size blocks, fingerprint and length checks"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(10 * 1024 + 7)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        
+        compact_file = os.path.join(self.temp_dir.name, "data_compact.enc")
+        block_file = os.path.join(self.temp_dir.name, "data_block.enc")
+        encrypt_file(input_file, compact_file, pub_key_file, mode='compact')
+        encrypt_file(input_file, block_file, pub_key_file)
+        
+        # Header (5 + 43 + 11 bytes) then exactly k bytes per block, no length prefixes
+        k = (self.public_key[0].bit_length() + 7) // 8
+        blocks = -(-len(data) // ((self.public_key[0].bit_length() // 8) - 66))
+        self.assertEqual(os.path.getsize(compact_file), 59 + blocks * k)
+        self.assertEqual(os.path.getsize(block_file) - os.path.getsize(compact_file), 4 * blocks - 48)
+        with open(compact_file, 'rb') as f:
+            header = f.read(59)
+        self.assertEqual(header[5], 2)
+        self.assertEqual(header[8:40], key_fingerprint(self.public_key))
+        self.assertEqual(key_fingerprint(self.public_key), key_fingerprint(self.private_key))
+        
+        # A different key pair is rejected from the header alone
+        _, other_private = generate_keypair(1024)
+        with self.assertRaisesRegex(ValueError, "different key"):
+            with open(compact_file, 'rb') as f:
+                b''.join(decrypt_iter(f, other_private))
+        
+        # Dropping whole blocks or part of one is detected
+        with open(compact_file, 'rb') as f:
+            encrypted = f.read()
+        for truncated in (encrypted[:-k], encrypted[:-1]):
+            with self.assertRaises(ValueError):
+                b''.join(decrypt_iter(io.BytesIO(truncated), self.private_key))
+        
+        # A non-seekable input has no known length, which decryption accepts
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(write_fd, 'wb') as pipe_in:
+            pipe_in.write(data[:1000])
+        with os.fdopen(read_fd, 'rb', buffering=0) as pipe_out:
+            encrypted = b''.join(encrypt_iter(pipe_out, self.public_key, mode='compact'))
+        self.assertEqual(encrypted[40:48], b'\xff' * 8)
+        self.assertEqual(b''.join(decrypt_iter(io.BytesIO(encrypted), self.private_key)), data[:1000])
+    
+    def test_parallel_file_encryption(self):
+        """Test that the multi-process pipeline produces the same block format"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(30 * 1024 + 5)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        
+        parallel_file = os.path.join(self.temp_dir.name, "parallel.enc")
+        serial_file = os.path.join(self.temp_dir.name, "serial.enc")
+        encrypt_file(input_file, parallel_file, pub_key_file, workers=2)
+        encrypt_file(input_file, serial_file, pub_key_file)
+        self.assertEqual(os.path.getsize(parallel_file), os.path.getsize(serial_file))
+        
+        # Each file can be decrypted by either path
+        for encrypted_file, workers in ((parallel_file, None), (serial_file, 2)):
+            output = decrypt_file(encrypted_file, os.path.join(self.temp_dir.name, "out.bin"),
+                                  priv_key_file, workers=workers)
+            with open(output, 'rb') as f:
+                self.assertEqual(f.read(), data)
+    
+    def test_hybrid_tamper_detection(self):
+        """Test that a modified hybrid file is rejected and no output is left"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        input_file = os.path.join(self.temp_dir.name, "data.txt")
+        with open(input_file, 'wb') as f:
+            f.write(b"hybrid" * 1000)
+        
+        encrypted_file = os.path.join(self.temp_dir.name, "data.enc")
+        decrypted_file = os.path.join(self.temp_dir.name, "data.txt.out")
+        encrypt_file(input_file, encrypted_file, pub_key_file, mode='hybrid')
+        
+        with open(encrypted_file, 'r+b') as f:
+            f.seek(-100, os.SEEK_END)
+            byte = f.read(1)
+            f.seek(-100, os.SEEK_END)
+            f.write(bytes([byte[0] ^ 1]))
+        
+        with self.assertRaises(ValueError):
+            decrypt_file(encrypted_file, decrypted_file, priv_key_file)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, "data.txt.txt")))
+        
+        # A forged chunk size is rejected before any chunk buffer is allocated
+        for chunk_size in (0, 2**32 - 1):
+            encrypt_file(input_file, encrypted_file, pub_key_file, mode='hybrid')
+            with open(encrypted_file, 'r+b') as f:
+                f.seek(5 + 11)  # magic, format byte, extension header
+                f.write(chunk_size.to_bytes(4, byteorder='big'))
+            with self.assertRaises(ValueError):
+                decrypt_file(encrypted_file, decrypted_file, priv_key_file)
+    
+    def test_progress_and_cancel(self):
+        """Test progress reporting and cancellation of file operations and key generation"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(5000)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        encrypted_file = os.path.join(self.temp_dir.name, "data.enc")
+        decrypted_file = os.path.join(self.temp_dir.name, "data.out.bin")
+        
+        updates = []
+        encrypt_file(input_file, encrypted_file, pub_key_file,
+                     progress=lambda *values: updates.append(values))
+        self.assertEqual(updates[-1][1:], (len(data), len(data)))
+        self.assertEqual([u[0] for u in updates], list(range(1, len(updates) + 1)))
+        
+        updates = []
+        decrypt_file(encrypted_file, decrypted_file, priv_key_file,
+                     progress=lambda *values: updates.append(values))
+        self.assertEqual(updates[-1][1:], (os.path.getsize(encrypted_file),) * 2)
+        
+        # Cancelling after the first block stops the work and removes the partial output
+        for run in (lambda p, c: decrypt_file(encrypted_file, decrypted_file, priv_key_file, progress=p, cancel=c),
+                    lambda p, c: encrypt_file(input_file, encrypted_file, pub_key_file, progress=p, cancel=c)):
+            cancel = threading.Event()
+            with self.assertRaises(OperationCancelled):
+                run(lambda *values: cancel.set(), cancel)
+        self.assertFalse(os.path.exists(encrypted_file))
+        self.assertFalse(os.path.exists(decrypted_file))
+        
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(OperationCancelled):
+            generate_keypair(self.key_bits, cancel=cancel)
+        found = []
+        generate_keypair(self.key_bits, progress=lambda *values: found.append(values))
+        self.assertEqual(found, [(1, 2), (2, 2)])
+    
+    def test_instrumentation(self):
+        """Test per-stage metrics collected around file encryption and decryption"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(1000)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        encrypted_file = os.path.join(self.temp_dir.name, "data.enc")
+        blocks = -(-len(data) // (self.key_bits // 8 - 66))
+        
+        exported = []
+        label_hash.cache_clear()  # The label hash is counted on a cache miss only
+        with instrument.collect(callback=exported.append) as metrics:
+            encrypt_file(input_file, encrypted_file, pub_key_file)
+            decrypt_file(encrypted_file, os.path.join(self.temp_dir.name, "data.out.bin"), priv_key_file)
+        self.assertIsNone(instrument.active)
+        
+        values = metrics.as_dict()
+        self.assertEqual(exported, [values])
+        self.assertEqual(values['blocks.encrypted'], blocks)
+        self.assertEqual(values['blocks.decrypted'], blocks)
+        self.assertEqual(values['modexp.count'], 2 * blocks)
+        self.assertEqual(values['eme.encodes'], blocks)
+        self.assertEqual(values['mgf1.calls'], 4 * blocks)
+        # One label lookup per OAEPContext (encrypt and decrypt); only the first is hashed
+        self.assertEqual(values['hash.label_lookups'], 2)
+        self.assertEqual(values['hash.calls'], values['mgf1.blocks'] + 1)
+        self.assertEqual(values['io.read_bytes'], len(data) + os.path.getsize(encrypted_file))
+        self.assertEqual(values['io.write_bytes'], len(data) + os.path.getsize(encrypted_file))
+        self.assertGreater(values['modexp.seconds'], 0)
+        
+        # Nothing is recorded once the context has exited
+        encrypt_file(input_file, encrypted_file, pub_key_file)
+        self.assertEqual(metrics.as_dict(), values)
+    
+    def test_hash_backends(self):
+        """Test the hash registry: reference vs hashlib cross-check, SHA-384/512 files"""
+        # OAEP with SHA-512 needs k >= 2 * 64 + 2 bytes, more than a 1024-bit key has
+        with self.assertRaises(ValueError):
+            OAEPContext(self.public_key, hash_backend='sha512')
+        self.public_key, self.private_key = generate_keypair(1536)
+        
+        seed = os.urandom(32)
+        for length in (1, 32, 95, 1000):
+            self.assertEqual(mgf1(seed, length, 'custom_sha256'), mgf1(seed, length, 'sha256'))
+        message = b"cross-check"
+        reference = OAEPContext(self.public_key, hash_backend='custom_sha256')
+        native = OAEPContext(self.public_key, hash_backend='sha256')
+        self.assertEqual(reference.eme_encode(message, seed), native.eme_encode(message, seed))
+        self.assertEqual(oaep_decrypt(reference.encrypt(message), self.private_key), message)
+        
+        for name in ('sha384', 'sha512'):
+            ciphertext = oaep_encrypt(message, self.public_key, hash_backend=name)
+            self.assertEqual(oaep_decrypt(ciphertext, self.private_key, hash_backend=name), message)
+            with self.assertRaises(ValueError):
+                oaep_decrypt(ciphertext, self.private_key)
+        self.assertEqual(OAEPContext(self.public_key, hash_backend='sha512').max_message_length,
+                         1536 // 8 - 2 * 64 - 2)
+        with self.assertRaises(ValueError):
+            get_hash('md5')
+        
+        # The hash is recorded in the file header, so decrypt_file needs no hint
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(2000)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        for mode in ('block', 'hybrid', 'seekable'):
+            for name in ('sha256', 'sha384', 'sha512'):
+                encrypted_file = os.path.join(self.temp_dir.name, f"data_{mode}_{name}.enc")
+                encrypt_file(input_file, encrypted_file, pub_key_file, mode=mode, hash_backend=name)
+                with open(encrypted_file, 'rb') as f:
+                    head = f.read(5)
+                if mode == 'block' and name == 'sha256':
+                    # SHA-256 block files keep the legacy layout
+                    self.assertEqual(head[0], len(".bin"))
+                else:
+                    self.assertEqual(head[:4], b'RSAO')
+                output = decrypt_file(encrypted_file, os.path.join(self.temp_dir.name, "out.bin"),
+                                      priv_key_file)
+                with open(output, 'rb') as f:
+                    self.assertEqual(f.read(), data)
+                if mode == 'seekable':
+                    self.assertEqual(decrypt_range(encrypted_file, 100, 50, priv_key_file), data[100:150])
+    
+    def test_cli_directory_batch(self):
+        """Test recursive CLI encryption/decryption and skipping finished files on re-run"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        source = os.path.join(self.temp_dir.name, "src")
+        os.makedirs(os.path.join(source, "sub"))
+        files = {"a.txt": b"alpha" * 100, os.path.join("sub", "b.bin"): os.urandom(3000)}
+        for name, data in files.items():
+            with open(os.path.join(source, name), 'wb') as f:
+                f.write(data)
+        
+        encrypted = os.path.join(self.temp_dir.name, "enc")
+        restored = os.path.join(self.temp_dir.name, "out")
+        self.assertEqual(cli_main(['encrypt', source, encrypted, '--key', pub_key_file,
+                                   '--mode', 'hybrid', '--jobs', '1']), 0)
+        enc_file = os.path.join(encrypted, "sub", "b.bin.enc")
+        mtime = os.path.getmtime(enc_file)
+        self.assertEqual(cli_main(['encrypt', source, encrypted, '--key', pub_key_file, '--jobs', '1']), 0)
+        self.assertEqual(os.path.getmtime(enc_file), mtime)
+        
+        self.assertEqual(cli_main(['decrypt', encrypted, restored, '--key', priv_key_file, '--jobs', '1']), 0)
+        for name, data in files.items():
+            with open(os.path.join(restored, name), 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+    
+    def test_keyring(self):
+        """Test fingerprint lookup, the persistent index and incremental refresh"""
+        keyring_dir = os.path.join(self.temp_dir.name, "keys")
+        os.makedirs(keyring_dir)
+        pairs = [self.public_key, self.private_key], list(generate_keypair(1024))
+        for i, (public_key, private_key) in enumerate(pairs):
+            save_key_to_file(public_key, os.path.join(keyring_dir, f"k{i}_public.txt"))
+            save_key_to_file(private_key, os.path.join(keyring_dir, f"k{i}_private.key"), binary=True)
+        with open(os.path.join(keyring_dir, "notes.txt"), 'w') as f:
+            f.write("not a key")
+        # A damaged binary key is indexed as "not a key" instead of breaking the keyring
+        with open(os.path.join(keyring_dir, "k1_private.key"), 'rb') as f:
+            damaged = f.read()[:40]
+        with open(os.path.join(keyring_dir, "damaged.key"), 'wb') as f:
+            f.write(damaged)
+        
+        keyring = Keyring(keyring_dir)
+        self.assertEqual(len(keyring), 4)
+        fingerprint = key_fingerprint(pairs[1][0])
+        self.assertEqual(keyring.find(fingerprint), os.path.join(keyring_dir, "k1_private.key"))
+        self.assertEqual(keyring.find(fingerprint, private=False), os.path.join(keyring_dir, "k1_public.txt"))
+        
+        # The index is reused: a new keyring parses nothing until files change
+        self.assertEqual(Keyring(keyring_dir).refresh(), 0)
+        
+        # Malformed index entries are dropped and their key files read again
+        index_file = os.path.join(keyring_dir, ".keyring_index.json")
+        with open(index_file) as f:
+            index = json.load(f)
+        del index['keys']['k1_private.key']['fingerprint']
+        index['keys']['k0_public.txt'] = "not an entry"
+        with open(index_file, 'w') as f:
+            json.dump(index, f)
+        repaired = Keyring(keyring_dir, auto_refresh=False)
+        self.assertEqual(repaired.find(fingerprint), os.path.join(keyring_dir, "k1_private.key"))
+        self.assertEqual(len(repaired), 4)
+        public_key, private_key = generate_keypair(1024)
+        save_key_to_file(private_key, os.path.join(keyring_dir, "k2_private.txt"))
+        self.assertEqual(Keyring(keyring_dir, auto_refresh=False).refresh(), 0)
+        self.assertEqual(keyring.find(key_fingerprint(public_key)), os.path.join(keyring_dir, "k2_private.txt"))
+        
+        # Compact files are decrypted with the key named by their fingerprint
+        source = os.path.join(self.temp_dir.name, "src")
+        os.makedirs(source)
+        data = os.urandom(1000)
+        for i in range(len(pairs)):
+            with open(os.path.join(source, f"f{i}.bin"), 'wb') as f:
+                f.write(data)
+            encrypted_file = os.path.join(source, f"f{i}.bin.enc")
+            encrypt_file(os.path.join(source, f"f{i}.bin"), encrypted_file,
+                         os.path.join(keyring_dir, f"k{i}_public.txt"), mode='compact')
+            self.assertEqual(keyring.key_for_file(encrypted_file),
+                             os.path.join(keyring_dir, f"k{i}_private.key"))
+        restored = os.path.join(self.temp_dir.name, "out")
+        self.assertEqual(cli_main(['decrypt', source, restored, '--keyring', keyring_dir, '--jobs', '1']), 0)
+        for i in range(len(pairs)):
+            with open(os.path.join(restored, f"f{i}.bin"), 'rb') as f:
+                self.assertEqual(f.read(), data)
+        
+        # Formats without a fingerprint cannot be matched
+        block_file = os.path.join(source, "block.enc")
+        encrypt_file(os.path.join(source, "f0.bin"), block_file,
+                     os.path.join(keyring_dir, "k0_public.txt"), mode='block')
+        with self.assertRaises(ValueError):
+            keyring.key_for_file(block_file)
+        
+        # An index that cannot be written is kept in memory only
+        unwritable_dir = os.path.join(self.temp_dir.name, "unwritable")
+        os.makedirs(os.path.join(unwritable_dir, ".keyring_index.json"))
+        save_key_to_file(self.private_key, os.path.join(unwritable_dir, "k_private.txt"))
+        self.assertEqual(len(Keyring(unwritable_dir)), 1)
+    
+    def test_resume_after_cancel(self):
+        """Test that an interrupted resumable run continues from its last checkpoint"""
+        pub_key_file, priv_key_file = self._write_key_files()
+        data = os.urandom(20000)
+        input_file = os.path.join(self.temp_dir.name, "data.bin")
+        with open(input_file, 'wb') as f:
+            f.write(data)
+        
+        for mode in ('block', 'compact'):
+            encrypted_file = os.path.join(self.temp_dir.name, f"data_{mode}.enc")
+            decrypted_file = os.path.join(self.temp_dir.name, f"data_{mode}.out.bin")
+            runs = (lambda p, c: encrypt_resumable(input_file, encrypted_file, pub_key_file, mode,
+                                                   progress=p, cancel=c, checkpoint_blocks=16),
+                    lambda p, c: decrypt_resumable(encrypted_file, decrypted_file, priv_key_file,
+                                                   progress=p, cancel=c, checkpoint_blocks=16))
+            for run, output_file in zip(runs, (encrypted_file, decrypted_file)):
+                # Cancel after 40 blocks: the partial output and its journal are kept
+                cancel = threading.Event()
+                with self.assertRaises(OperationCancelled):
+                    run(lambda written, *_: written == 40 and cancel.set(), cancel)
+                with open(output_file + '.journal') as f:
+                    self.assertIn('"block_index": 40', f.read())
+                
+                # The rerun only processes the remaining blocks
+                updates = []
+                run(lambda *values: updates.append(values), None)
+                self.assertEqual(updates[0][0], 41)
+                self.assertFalse(os.path.exists(output_file + '.journal'))
+            
+            with open(decrypted_file, 'rb') as f:
+                self.assertEqual(f.read(), data)
+            fresh_file = os.path.join(self.temp_dir.name, f"fresh_{mode}.enc")
+            encrypt_file(input_file, fresh_file, pub_key_file, mode)
+            self.assertEqual(os.path.getsize(encrypted_file), os.path.getsize(fresh_file))
+        
+        # Formats that cannot be resumed are rejected
+        with self.assertRaises(ValueError):
+            encrypt_file(input_file, encrypted_file, pub_key_file, 'hybrid', resume=True)
 
 
 if __name__ == "__main__":